@@ -0,0 +1,133 @@
+import json
+from typing import Dict, Any, List
+
+MAX_BATCH_REQUESTS = 20
+MAX_BATCH_CONCURRENCY = 4
+# Заголовки клиента, которые передаются во все подзапросы (права и пользователь)
+FORWARDED_HEADERS = ('x-user-id', 'x-user-email', 'x-forwarded-for', 'x-consistency-token')
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_batch(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    '''
+    Business: Разбирает тело пакетного запроса и превращает подзапросы в события функций
+    Args: event с body {"requests": [{"method", "path", "query", "body", "headers"}]}
+    Returns: список событий в формате облачной функции; BatchError при неверном теле
+    '''
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        raise BatchError('Invalid JSON body')
+
+    requests = body.get('requests') if isinstance(body, dict) else None
+    if not isinstance(requests, list) or not requests:
+        raise BatchError('requests array required')
+    if len(requests) > MAX_BATCH_REQUESTS:
+        raise BatchError(f'At most {MAX_BATCH_REQUESTS} requests per batch')
+
+    outer_headers = {
+        key: value for key, value in (event.get('headers') or {}).items()
+        if key.lower() in FORWARDED_HEADERS
+    }
+
+    events = []
+    for sub_request in requests:
+        if not isinstance(sub_request, dict) or not isinstance(sub_request.get('path'), str):
+            raise BatchError('Each request needs a path')
+        method = str(sub_request.get('method') or 'GET').upper()
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+            raise BatchError(f'Unsupported method {method}')
+        query = sub_request.get('query') or {}
+        if not isinstance(query, dict):
+            raise BatchError('query must be an object')
+        sub_headers = sub_request.get('headers') or {}
+        if not isinstance(sub_headers, dict) \
+                or not all(isinstance(key, str) and isinstance(value, str) for key, value in sub_headers.items()):
+            raise BatchError('headers must be an object of strings')
+        sub_body = sub_request.get('body')
+
+        events.append({
+            'httpMethod': method,
+            'path': sub_request['path'],
+            'queryStringParameters': {key: str(value) for key, value in query.items()},
+            'headers': dict(outer_headers, **sub_headers),
+            'body': sub_body if sub_body is None or isinstance(sub_body, str) else json.dumps(sub_body),
+            'requestContext': event.get('requestContext') or {},
+            'isBase64Encoded': False
+        })
+    return events
+
+
+def to_batch_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    headers = response.get('headers') or {}
+    body = response.get('body', '')
+    if not response.get('isBase64Encoded') and 'json' in headers.get('Content-Type', '') and body:
+        try:
+            body = json.loads(body)
+        except ValueError:
+            pass
+    return {
+        'status': response.get('statusCode', 200),
+        'headers': headers,
+        'body': body,
+        'isBase64Encoded': bool(response.get('isBase64Encoded'))
+    }
+
+
+def handle(event: Dict[str, Any], context: Any, dispatch) -> Dict[str, Any]:
+    '''
+    Business: Выполняет пачку подзапросов к auth/books/music за один вызов
+    Args: event с body {"requests": [...]}, context, dispatch - функция шлюза для одного подзапроса
+    Returns: HTTP response {"responses": [...]} в порядке подзапросов
+    '''
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        events = parse_batch(event)
+    except BatchError as error:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(error)}),
+            'isBase64Encoded': False
+        }
+
+    def run(sub_event: Dict[str, Any]) -> Dict[str, Any]:
+        if sub_event['path'].strip('/').split('/')[0] == 'batch':
+            return {'statusCode': 400, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps({'error': 'Nested batch'})}
+        try:
+            return dispatch(sub_event, context)
+        except Exception as error:
+            print(f'Batch sub-request {sub_event["httpMethod"]} {sub_event["path"]} failed: {error}')
+            return {'statusCode': 500, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps({'error': 'Internal error'})}
+
+    # Подряд идущие GET независимы и выполняются параллельно на соединениях общего пула;
+    # запись выполняется отдельно, чтобы следующие чтения видели её результат
+    responses: List[Dict[str, Any]] = []
+    position = 0
+    with ThreadPoolExecutor(max_workers=min(MAX_BATCH_CONCURRENCY, len(events))) as executor:
+        while position < len(events):
+            if events[position]['httpMethod'] != 'GET':
+                responses.append(run(events[position]))
+                # Следующие подзапросы читают с реплики, догнавшей эту запись
+                token = (responses[-1].get('headers') or {}).get('X-Consistency-Token')
+                if token:
+                    for later_event in events[position + 1:]:
+                        later_event['headers']['X-Consistency-Token'] = token
+                position += 1
+                continue
+            end = position
+            while end < len(events) and events[end]['httpMethod'] == 'GET':
+                end += 1
+            responses.extend(executor.map(run, events[position:end]))
+            position = end
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'responses': [to_batch_response(response) for response in responses]}),
+        'isBase64Encoded': False
+    }
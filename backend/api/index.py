@@ -0,0 +1,111 @@
+import os
+import sys
+from typing import Dict, Any, Tuple
+
+# Каталог с функциями auth/books/music: по умолчанию соседние каталоги backend/,
+# при сборке шлюза в один архив - GATEWAY_FUNCTIONS_DIR
+FUNCTIONS_DIR = os.environ.get('GATEWAY_FUNCTIONS_DIR') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FUNCTIONS = ('auth', 'books', 'music')
+
+# Первый сегмент пути -> (функция, отрезать ли сегмент перед передачей в функцию).
+# Пути /purchases, /stories и платёжные пути books сами проверяет по подстроке, поэтому их не режем
+ROUTES: Dict[str, Tuple[str, bool]] = {
+    'auth': ('auth', True),
+    'books': ('books', True),
+    'music': ('music', True),
+    'purchases': ('books', False),
+    'stories': ('books', False),
+    'yoomoney-form': ('books', False),
+    'yoomoney-webhook': ('books', False)
+}
+
+# Один пул соединений на тёплый контейнер для всех трёх функций
+os.environ.setdefault('DB_POOL_SIZE', '10')
+
+# Имена модулей маршрутов уникальны между функциями, а db.py у них одинаковый,
+# поэтому все три каталога можно положить в один sys.path
+for _name in FUNCTIONS:
+    _function_dir = os.path.join(FUNCTIONS_DIR, _name)
+    if _function_dir not in sys.path:
+        sys.path.append(_function_dir)
+
+_handlers: Dict[str, Any] = {}
+
+
+def get_handler(name: str):
+    '''
+    Business: Загружает index.py функции при первом обращении к ней
+    Args: name - auth, books или music
+    Returns: функция handler(event, context) из index.py этой функции
+    '''
+    handler_fn = _handlers.get(name)
+    if handler_fn is None:
+        import importlib.util
+
+        spec = importlib.util.spec_from_file_location(f'{name}_index', os.path.join(FUNCTIONS_DIR, name, 'index.py'))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        handler_fn = _handlers[name] = module.handler
+    return handler_fn
+
+
+def resolve(path: str) -> Tuple[Any, str]:
+    '''
+    Business: Находит функцию по первому сегменту пути
+    Args: path - путь запроса к шлюзу, например /books/purchases
+    Returns: (имя функции или None, путь для передачи в функцию)
+    '''
+    segment, _, rest = (path or '/').lstrip('/').partition('/')
+    route = ROUTES.get(segment)
+    if route is None:
+        return None, path
+    name, strip = route
+    return name, '/' + rest if strip else path
+
+
+def dispatch(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Передаёт запрос функции, которой принадлежит путь
+    Args: event и context облачной функции
+    Returns: HTTP response функции или 404 для неизвестного пути
+    '''
+    name, function_path = resolve(event.get('path', ''))
+
+    if name is None:
+        import json
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Unknown route', 'routes': sorted(['/batch'] + [f'/{segment}' for segment in ROUTES])}),
+            'isBase64Encoded': False
+        }
+
+    return get_handler(name)(dict(event, path=function_path), context)
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    '''
+    Business: Объединённая точка входа для auth, books и music с общим пулом соединений и кэшами
+    Args: event с path вида /auth/..., /books/..., /music/... или POST /batch с пачкой подзапросов
+    Returns: HTTP response соответствующей функции, ответ пакета или 404 для неизвестного пути
+    '''
+    method: str = event.get('httpMethod', 'GET')
+
+    if (event.get('path') or '').strip('/') == 'batch':
+        if method == 'OPTIONS':
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Content-Type, X-User-Id, X-User-Email, X-Consistency-Token',
+                    'Access-Control-Max-Age': '86400'
+                },
+                'body': '',
+                'isBase64Encoded': False
+            }
+        if method == 'POST':
+            import batch
+            return batch.handle(event, context, dispatch)
+
+    return dispatch(event, context)
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Any, List
+
+from db import connect, SCHEMA_NAME
+
+PAGE_LIMIT_DEFAULT = 50
+PAGE_LIMIT_MAX = 200
+EXPORT_CHUNK_LIMIT = 50000
+EXPORT_ITERSIZE = 2000
+# Часть выгрузки ограничена и по объёму: тело ответа функции не больше 3 МБ
+EXPORT_CHUNK_BYTES = 3 * 1024 * 1024
+TEXT_FLUSH_BYTES = 64 * 1024
+
+
+def list_users(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Справочник пользователей для администратора с keyset-пагинацией, поиском и экспортом
+    Args: params с limit, cursor, q (префикс email/имени), export (csv/ndjson)
+    Returns: HTTP response со страницей пользователей и nextCursor либо файл выгрузки
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        search = (params.get('q') or '').strip().lower()
+        export_format = params.get('export')
+        cursor_token = params.get('cursor')
+        if export_format:
+            import rate_limit
+            # Курсор выгрузки подписан (X-Next-Cursor); подпись проверяет ограничитель в index.py
+            cursor_token, _ = rate_limit.split_cursor('users-export', cursor_token)
+        
+        if export_format and export_format not in ('csv', 'ndjson'):
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Unsupported export format'}),
+                'isBase64Encoded': False
+            }
+        
+        max_limit = EXPORT_CHUNK_LIMIT if export_format else PAGE_LIMIT_MAX
+        try:
+            limit = min(max(int(params.get('limit', max_limit if export_format else PAGE_LIMIT_DEFAULT)), 1), max_limit)
+        except ValueError:
+            limit = PAGE_LIMIT_DEFAULT
+        
+        conditions = []
+        query_params: List[Any] = []
+        
+        if search:
+            pattern = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append('(LOWER(email) LIKE %s OR LOWER(name) LIKE %s)')
+            query_params.extend([pattern, pattern])
+        
+        if cursor_token:
+            try:
+                cursor_created_at, cursor_id = cursor_token.rsplit('|', 1)
+                cursor_created_at = datetime.fromisoformat(cursor_created_at)
+                cursor_id = int(cursor_id)
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Invalid cursor'}),
+                    'isBase64Encoded': False
+                }
+            conditions.append('(created_at, id) < (%s, %s)')
+            query_params.extend([cursor_created_at, cursor_id])
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        query = f'''
+            SELECT id, email, name, is_admin, created_at
+            FROM {SCHEMA_NAME}.users {where_clause}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        '''
+        query_params.append(limit + 1)
+        
+        if export_format:
+            export_cursor = conn.cursor(name='users_export')
+            export_cursor.itersize = EXPORT_ITERSIZE
+            export_cursor.execute(query, query_params)
+            
+            # Текст копится в StringIO и переносится в байтовый буфер каждые TEXT_FLUSH_BYTES,
+            # так размер части известен без кодирования каждой строки; ещё не перенесённый текст
+            # считается в символах, а кириллица занимает два байта, отсюда запас в TEXT_FLUSH_BYTES
+            output = io.BytesIO()
+            text = io.StringIO()
+            writer = csv.writer(text)
+            if export_format == 'csv' and not cursor_token:
+                writer.writerow(['id', 'email', 'name', 'isAdmin', 'createdAt'])
+            
+            exported = 0
+            last_row = None
+            has_more = False
+            for row in export_cursor:
+                if exported == limit or output.tell() + text.tell() >= EXPORT_CHUNK_BYTES - TEXT_FLUSH_BYTES:
+                    has_more = True
+                    break
+                if export_format == 'csv':
+                    writer.writerow([row[0], row[1], row[2], row[3], row[4].isoformat()])
+                else:
+                    text.write(json.dumps({
+                        'id': row[0],
+                        'email': row[1],
+                        'name': row[2],
+                        'isAdmin': row[3],
+                        'createdAt': row[4].isoformat()
+                    }, ensure_ascii=False))
+                    text.write('\n')
+                if text.tell() >= TEXT_FLUSH_BYTES:
+                    output.write(text.getvalue().encode('utf-8'))
+                    text.seek(0)
+                    text.truncate()
+                exported += 1
+                last_row = row
+            export_cursor.close()
+            output.write(text.getvalue().encode('utf-8'))
+            
+            response_headers = {
+                'Content-Type': 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson',
+                'Content-Disposition': f'attachment; filename="users.{export_format}"',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Expose-Headers': 'X-Next-Cursor'
+            }
+            if has_more:
+                response_headers['X-Next-Cursor'] = rate_limit.sign_cursor(
+                    'users-export', f'{last_row[4].isoformat()}|{last_row[0]}'
+                )
+            
+            return {
+                'statusCode': 200,
+                'headers': response_headers,
+                'body': output.getvalue().decode('utf-8'),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(query, query_params)
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        users = []
+        for row in rows:
+            users.append({
+                'id': row[0],
+                'email': row[1],
+                'name': row[2],
+                'isAdmin': row[3],
+                'createdAt': row[4].isoformat()
+            })
+        
+        next_cursor = f'{rows[-1][4].isoformat()}|{rows[-1][0]}' if has_more else None
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'users': users, 'nextCursor': next_cursor}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
@@ -1,6 +1,4 @@
 import json
-import os
-import psycopg2
 from typing import Dict, Any
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -17,171 +15,55 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'headers': {
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, X-User-Email',
+                'Access-Control-Allow-Headers': 'Content-Type, X-User-Email, X-Consistency-Token',
                 'Access-Control-Max-Age': '86400'
             },
             'body': '',
             'isBase64Encoded': False
         }
     
-    db_url = os.environ.get('DATABASE_URL')
-    conn = psycopg2.connect(db_url)
-    cursor = conn.cursor()
-    
-    schema_name = 't_p48697888_litres_site_creation'
-    
-    try:
-        if method == 'GET':
-            params = event.get('queryStringParameters') or {}
-            email = params.get('email')
-            password = params.get('password')
-            all_users = params.get('all')
-            stats = params.get('stats')
-            
-            if stats == 'true':
-                cursor.execute(f'SELECT COUNT(*) FROM {schema_name}.users')
-                users_count = cursor.fetchone()[0]
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'usersCount': users_count}),
-                    'isBase64Encoded': False
-                }
-            
-            if all_users == 'true':
-                cursor.execute(f'''
-                    SELECT id, email, name, is_admin, created_at
-                    FROM {schema_name}.users ORDER BY created_at DESC
-                ''')
-                
-                rows = cursor.fetchall()
-                users = []
-                for row in rows:
-                    users.append({
-                        'id': row[0],
-                        'email': row[1],
-                        'name': row[2],
-                        'isAdmin': row[3],
-                        'createdAt': row[4].isoformat()
-                    })
-                
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'users': users}),
-                    'isBase64Encoded': False
-                }
-            
-            if not email:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Email required'}),
-                    'isBase64Encoded': False
-                }
-            
-            cursor.execute(f'''
-                SELECT id, email, name, is_admin, created_at, password_hash
-                FROM {schema_name}.users WHERE email = %s
-            ''', (email,))
-            
-            row = cursor.fetchone()
-            
-            if not row:
-                return {
-                    'statusCode': 404,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'User not found'}),
-                    'isBase64Encoded': False
-                }
-            
-            if password:
-                stored_password = row[5]
-                if stored_password and password != stored_password:
-                    return {
-                        'statusCode': 401,
-                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                        'body': json.dumps({'error': 'Invalid password'}),
-                        'isBase64Encoded': False
-                    }
-            
-            user = {
-                'id': row[0],
-                'email': row[1],
-                'name': row[2],
-                'isAdmin': row[3],
-                'createdAt': row[4].isoformat()
-            }
-            
-            return {
-                'statusCode': 200,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'user': user}),
-                'isBase64Encoded': False
-            }
+    # GET читает с реплики (DATABASE_READ_URL), если она догнала токен клиента;
+    # ответ на запись получает токен для чтения своих записей
+    import db
+    db.bind_request(event)
+    return db.attach_consistency_token(event, route(event, method))
+
+
+def route(event: Dict[str, Any], method: str) -> Dict[str, Any]:
+    '''
+    Business: Выбирает модуль маршрута по методу, пути и параметрам запроса
+    Args: event запроса, method - HTTP-метод
+    Returns: HTTP response маршрута
+    '''
+    # Модули маршрутов (и вместе с ними psycopg2) импортируются только
+    # при первом обращении к маршруту, чтобы не удлинять холодный старт
+    if method == 'GET':
+        params = event.get('queryStringParameters') or {}
         
-        elif method == 'POST':
-            body_data = json.loads(event.get('body', '{}'))
-            email = body_data.get('email')
-            name = body_data.get('name')
-            
-            if not email or not name:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': 'Email and name required'}),
-                    'isBase64Encoded': False
-                }
-            
-            cursor.execute(f'SELECT id, email, name, is_admin FROM {schema_name}.users WHERE email = %s', (email,))
-            existing_user = cursor.fetchone()
-            
-            if existing_user:
-                user = {
-                    'id': existing_user[0],
-                    'email': existing_user[1],
-                    'name': existing_user[2],
-                    'isAdmin': existing_user[3]
-                }
-                return {
-                    'statusCode': 200,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'user': user, 'message': 'User already exists'}),
-                    'isBase64Encoded': False
-                }
-            
-            cursor.execute(f'''
-                INSERT INTO {schema_name}.users (email, name, is_admin)
-                VALUES (%s, %s, %s)
-                RETURNING id, email, name, is_admin, created_at
-            ''', (email, name, False))
-            
-            row = cursor.fetchone()
-            conn.commit()
-            
-            user = {
-                'id': row[0],
-                'email': row[1],
-                'name': row[2],
-                'isAdmin': row[3],
-                'createdAt': row[4].isoformat()
-            }
-            
-            return {
-                'statusCode': 201,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'user': user, 'message': 'User created'}),
-                'isBase64Encoded': False
-            }
+        if params.get('stats') == 'true':
+            import rate_limit
+            import users
+            return rate_limit.limited(event, 'auth', 'stats', users.users_stats)
         
-        return {
-            'statusCode': 405,
-            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-            'body': json.dumps({'error': 'Method not allowed'}),
-            'isBase64Encoded': False
-        }
+        if params.get('all') == 'true':
+            import directory
+            import rate_limit
+            route_name = 'users-export' if params.get('export') else 'users-directory'
+            return rate_limit.limited(
+                event, 'auth', route_name, lambda: directory.list_users(params),
+                continuation=bool(params.get('export')) and rate_limit.split_cursor(route_name, params.get('cursor'))[1]
+            )
         
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        import users
+        return users.get_user(params)
+    
+    elif method == 'POST':
+        import users
+        return users.register(event)
+    
+    return {
+        'statusCode': 405,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'error': 'Method not allowed'}),
+        'isBase64Encoded': False
+    }
@@ -0,0 +1,256 @@
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+# Маршрут -> (стоимость в токенах, предел одновременных запросов на экземпляр функции);
+# предел считается отдельно для каждой функции, даже если шлюз загрузил их в один процесс
+ROUTE_LIMITS: Dict[str, Tuple[float, int]] = {
+    'stats': (5, 2),
+    'users-directory': (5, 2),
+    'users-export': (20, 1),
+    'purchases-export': (20, 1),
+    'catalog-list': (2, 8),
+    # Страница каталога (limit=) отвечает из снимка в памяти и стоит дешевле полного списка
+    'catalog-page': (0.5, 16),
+    # Прослушивание трека (music, action=play) - анонимная запись в track_popularity
+    'play': (1, 16)
+}
+# Продолжение выгрузки (запрос с cursor) - часть уже оплаченной выгрузки: полная стоимость
+# за каждую часть растянула бы выгрузку миллиона строк на десятки минут ожидания
+CONTINUATION_COST = 1
+# Скидку получает только курсор, выданный сервером: X-Next-Cursor подписывается HMAC.
+# Ключ - EXPORT_CURSOR_SECRET, без него - DATABASE_URL, общий для всех экземпляров
+CURSOR_SIGNATURE_SEPARATOR = '~'
+# Ведро клиента: RATE_LIMIT_CAPACITY токенов, пополнение RATE_LIMIT_REFILL_PER_SECOND в секунду;
+# RATE_LIMIT_STORE=postgres хранит вёдра в БД, общими для всех экземпляров
+RATE_LIMIT_CAPACITY = float(os.environ.get('RATE_LIMIT_CAPACITY', 60))
+RATE_LIMIT_REFILL_PER_SECOND = float(os.environ.get('RATE_LIMIT_REFILL_PER_SECOND', 1))
+# Если запросы маршрута дольше целевого времени, предел одновременных запросов снижается
+TARGET_LATENCY_SECONDS = float(os.environ.get('RATE_LIMIT_TARGET_LATENCY', 1.0))
+MAX_TRACKED_CLIENTS = 10000
+STALE_BUCKETS_CLEANUP_PROBABILITY = 0.001
+
+
+class TokenBuckets:
+    '''
+    Business: Вёдра токенов клиентов в памяти экземпляра функции
+    Args: capacity - объём ведра, refill_per_second - скорость пополнения
+    Returns: хранилище, списывающее стоимость запроса или сообщающее, когда повторить
+    '''
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self.lock = threading.Lock()
+
+    def take(self, client: str, cost: float) -> float:
+        '''Возвращает 0, если токены списаны, иначе через сколько секунд их хватит'''
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at = self.buckets.pop(client, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+            wait_seconds = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait_seconds = (cost - tokens) / self.refill_per_second
+            self.buckets[client] = (tokens, now)
+            while len(self.buckets) > MAX_TRACKED_CLIENTS:
+                self.buckets.popitem(last=False)
+            return wait_seconds
+
+
+class PostgresTokenBuckets:
+    '''
+    Business: Вёдра токенов в таблице rate_limit_buckets, общие для всех экземпляров функций
+    Args: capacity - объём ведра, refill_per_second - скорость пополнения
+    Returns: хранилище с тем же интерфейсом, что TokenBuckets; пополнение и списание - одним запросом
+    '''
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    def take(self, client: str, cost: float) -> float:
+        from db import connect, SCHEMA_NAME
+
+        conn = connect(readonly=False)
+        cursor = conn.cursor()
+        try:
+            refilled = f'''LEAST(%(capacity)s, b.tokens
+                + EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - b.updated_at)) * %(rate)s)'''
+            cursor.execute(f'''
+                INSERT INTO {SCHEMA_NAME}.rate_limit_buckets AS b (client_key, tokens, updated_at)
+                VALUES (%(client)s, %(capacity)s - %(cost)s, CURRENT_TIMESTAMP)
+                ON CONFLICT (client_key) DO UPDATE
+                SET tokens = {refilled} - %(cost)s, updated_at = CURRENT_TIMESTAMP
+                WHERE {refilled} >= %(cost)s
+                RETURNING tokens
+            ''', {'client': client, 'capacity': self.capacity, 'rate': self.refill_per_second, 'cost': cost})
+            taken = cursor.fetchone() is not None
+            if random.random() < STALE_BUCKETS_CLEANUP_PROBABILITY:
+                # Полное ведро без активности ничем не отличается от отсутствующего
+                cursor.execute(f'''
+                    DELETE FROM {SCHEMA_NAME}.rate_limit_buckets
+                    WHERE updated_at < CURRENT_TIMESTAMP - INTERVAL '1 day'
+                ''')
+            wait_seconds = 0.0
+            if not taken:
+                cursor.execute(f'''
+                    SELECT {refilled} FROM {SCHEMA_NAME}.rate_limit_buckets b WHERE client_key = %(client)s
+                ''', {'client': client, 'capacity': self.capacity, 'rate': self.refill_per_second})
+                row = cursor.fetchone()
+                wait_seconds = (cost - float(row[0] if row else 0)) / self.refill_per_second
+            conn.commit()
+            return wait_seconds
+        finally:
+            cursor.close()
+            conn.close()
+
+
+class AdaptiveConcurrency:
+    '''
+    Business: Предел одновременных запросов маршрута, который снижается при росте задержки (AIMD)
+    Args: max_limit - верхний предел
+    Returns: счётчик, пропускающий запрос, только если предел ещё не достигнут
+    '''
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            if self.in_flight >= max(1, int(self.limit)):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, elapsed_seconds: float) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            if elapsed_seconds > TARGET_LATENCY_SECONDS:
+                self.limit = max(1.0, self.limit * 0.8)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+
+_buckets = None
+_concurrency: Dict[Tuple[str, str], AdaptiveConcurrency] = {}
+_state_lock = threading.Lock()
+
+
+def get_buckets():
+    global _buckets
+
+    with _state_lock:
+        if _buckets is None:
+            store = PostgresTokenBuckets if os.environ.get('RATE_LIMIT_STORE') == 'postgres' else TokenBuckets
+            _buckets = store(RATE_LIMIT_CAPACITY, RATE_LIMIT_REFILL_PER_SECOND)
+        return _buckets
+
+
+def get_concurrency(function: str, route: str) -> AdaptiveConcurrency:
+    with _state_lock:
+        key = (function, route)
+        if key not in _concurrency:
+            _concurrency[key] = AdaptiveConcurrency(ROUTE_LIMITS[route][1])
+        return _concurrency[key]
+
+
+def client_key(event: Dict[str, Any]) -> str:
+    '''
+    Business: Определяет клиента для ведра токенов
+    Args: event с requestContext.identity.sourceIp или заголовками X-Forwarded-For / X-User-Email
+    Returns: ключ клиента: IP, а без него - email пользователя
+    '''
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    source_ip = ((event.get('requestContext') or {}).get('identity') or {}).get('sourceIp')
+    forwarded_ip = (headers.get('x-forwarded-for') or '').split(',')[0].strip()
+    if source_ip or forwarded_ip:
+        return f'ip:{source_ip or forwarded_ip}'
+    return f"user:{headers.get('x-user-email') or headers.get('x-user-id') or 'anonymous'}"
+
+
+def _cursor_signature(route: str, cursor: str) -> str:
+    secret = (os.environ.get('EXPORT_CURSOR_SECRET') or os.environ.get('DATABASE_URL') or '').encode()
+    return hmac.new(secret, f'{route}\n{cursor}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def sign_cursor(route: str, cursor: str) -> str:
+    '''
+    Business: Подписывает курсор продолжения выгрузки для заголовка X-Next-Cursor
+    Args: route - ключ ROUTE_LIMITS выгрузки, cursor - курсор keyset-пагинации
+    Returns: курсор с подписью через CURSOR_SIGNATURE_SEPARATOR
+    '''
+    return f'{cursor}{CURSOR_SIGNATURE_SEPARATOR}{_cursor_signature(route, cursor)}'
+
+
+def split_cursor(route: str, token: Optional[str]) -> Tuple[Optional[str], bool]:
+    '''
+    Business: Отделяет подпись от курсора выгрузки
+    Args: route - ключ ROUTE_LIMITS выгрузки, token - значение параметра cursor
+    Returns: (курсор без подписи, выдан ли он сервером); неподписанный курсор тоже возвращается,
+             но как обычный запрос полной стоимости
+    '''
+    if not token:
+        return None, False
+    cursor, separator, signature = token.rpartition(CURSOR_SIGNATURE_SEPARATOR)
+    if not separator:
+        return token, False
+    return cursor, hmac.compare_digest(signature, _cursor_signature(route, cursor))
+
+def rejected(status: int, error: str, retry_after: float) -> Dict[str, Any]:
+    return {
+        'statusCode': status,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Retry-After',
+            'Retry-After': str(max(1, math.ceil(retry_after)))
+        },
+        'body': json.dumps({'error': error}),
+        'isBase64Encoded': False
+    }
+
+
+def limited(event: Dict[str, Any], function: str, route: str, run, continuation: bool = False) -> Dict[str, Any]:
+    '''
+    Business: Выполняет дорогой маршрут, если клиенту хватает токенов и маршрут не перегружен
+    Args: event запроса, function - имя функции (auth/books/music), route - ключ ROUTE_LIMITS,
+          run - функция без аргументов, выполняющая маршрут, continuation - следующая часть выгрузки
+    Returns: ответ маршрута, 429 при исчерпании ведра клиента или 503 при перегрузке, оба с Retry-After
+    '''
+    if os.environ.get('RATE_LIMIT_DISABLED') == 'true':
+        return run()
+
+    cost = CONTINUATION_COST if continuation else ROUTE_LIMITS[route][0]
+    try:
+        wait_seconds = get_buckets().take(client_key(event), cost)
+    except Exception as error:
+        # Недоступное общее хранилище не должно класть маршрут
+        print(f'Rate limit store failed, request allowed: {error}')
+        wait_seconds = 0.0
+    if wait_seconds > 0:
+        return rejected(429, 'Too many requests', wait_seconds)
+
+    concurrency = get_concurrency(function, route)
+    if not concurrency.try_acquire():
+        return rejected(503, 'Server is busy, retry later', 1)
+
+    started = time.monotonic()
+    try:
+        return run()
+    finally:
+        concurrency.release(time.monotonic() - started)
+
@@ -0,0 +1,163 @@
+import json
+from typing import Dict, Any
+
+from db import connect, SCHEMA_NAME
+
+
+def users_stats() -> Dict[str, Any]:
+    '''
+    Business: Количество зарегистрированных пользователей для дашборда
+    Args: нет
+    Returns: HTTP response с usersCount
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(f'SELECT COUNT(*) FROM {SCHEMA_NAME}.users')
+        users_count = cursor.fetchone()[0]
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'usersCount': users_count}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_user(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Получение пользователя по email с проверкой пароля
+    Args: params с email и необязательным password
+    Returns: HTTP response с данными пользователя или ошибкой
+    '''
+    email = params.get('email')
+    password = params.get('password')
+    
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        if not email:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Email required'}),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(f'''
+            SELECT id, email, name, is_admin, created_at, password_hash
+            FROM {SCHEMA_NAME}.users WHERE email = %s
+        ''', (email,))
+        
+        row = cursor.fetchone()
+        
+        if not row:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'User not found'}),
+                'isBase64Encoded': False
+            }
+        
+        if password:
+            stored_password = row[5]
+            if stored_password and password != stored_password:
+                return {
+                    'statusCode': 401,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Invalid password'}),
+                    'isBase64Encoded': False
+                }
+        
+        user = {
+            'id': row[0],
+            'email': row[1],
+            'name': row[2],
+            'isAdmin': row[3],
+            'createdAt': row[4].isoformat()
+        }
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'user': user}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def register(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Регистрация пользователя или возврат существующего
+    Args: event с body, содержащим email и name
+    Returns: HTTP response с данными пользователя
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        body_data = json.loads(event.get('body', '{}'))
+        email = body_data.get('email')
+        name = body_data.get('name')
+        
+        if not email or not name:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Email and name required'}),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(f'SELECT id, email, name, is_admin FROM {SCHEMA_NAME}.users WHERE email = %s', (email,))
+        existing_user = cursor.fetchone()
+        
+        if existing_user:
+            user = {
+                'id': existing_user[0],
+                'email': existing_user[1],
+                'name': existing_user[2],
+                'isAdmin': existing_user[3]
+            }
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'user': user, 'message': 'User already exists'}),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(f'''
+            INSERT INTO {SCHEMA_NAME}.users (email, name, is_admin)
+            VALUES (%s, %s, %s)
+            RETURNING id, email, name, is_admin, created_at
+        ''', (email, name, False))
+        
+        row = cursor.fetchone()
+        conn.commit()
+        
+        user = {
+            'id': row[0],
+            'email': row[1],
+            'name': row[2],
+            'isAdmin': row[3],
+            'createdAt': row[4].isoformat()
+        }
+        
+        return {
+            'statusCode': 201,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'user': user, 'message': 'User created'}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,97 @@
+import json
+import math
+from typing import Dict, Any
+
+from db import connect, SCHEMA_NAME
+
+TRENDING_EPOCH = '2025-01-01'
+TRENDING_HALF_LIFE_DAYS = 7
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60)
+
+# trending_score = ln(SUM(exp(DECAY_RATE * (t - TRENDING_EPOCH)))) - новое слагаемое
+# добавляется через log-sum-exp, так что старые строки не нужно пересчитывать со временем
+SALE_SCORE_SQL = f"EXTRACT(EPOCH FROM (LOCALTIMESTAMP - TIMESTAMP '{TRENDING_EPOCH}')) * {DECAY_RATE!r}"
+
+
+def record_sale(cursor, book_id: int) -> None:
+    '''
+    Business: Инкрементально учитывает продажу в материализованной популярности книги
+    Args: cursor - курсор транзакции, в которой записана покупка, book_id
+    Returns: None; изменения фиксируются вместе с покупкой
+    '''
+    cursor.execute(f'''
+        INSERT INTO {SCHEMA_NAME}.book_popularity AS p (book_id, sales_count, trending_score, updated_at)
+        VALUES (%s, 1, {SALE_SCORE_SQL}, CURRENT_TIMESTAMP)
+        ON CONFLICT (book_id) DO UPDATE SET
+            sales_count = p.sales_count + 1,
+            trending_score = GREATEST(p.trending_score, EXCLUDED.trending_score)
+                + LN(1 + EXP(GREATEST(-ABS(p.trending_score - EXCLUDED.trending_score), -700))),
+            updated_at = CURRENT_TIMESTAMP
+    ''', (book_id,))
+
+
+def rebuild(cursor) -> int:
+    '''
+    Business: Полный пересчёт популярности всех книг по таблице purchases
+    Args: cursor - курсор открытой транзакции
+    Returns: число книг с продажами
+    '''
+    cursor.execute(f'DELETE FROM {SCHEMA_NAME}.book_popularity')
+    cursor.execute(f'''
+        INSERT INTO {SCHEMA_NAME}.book_popularity (book_id, sales_count, trending_score)
+        SELECT book_id, COUNT(*), max_x + LN(SUM(EXP(GREATEST(x - max_x, -700))))
+        FROM (
+            SELECT book_id, x, MAX(x) OVER (PARTITION BY book_id) AS max_x
+            FROM (
+                SELECT book_id,
+                       EXTRACT(EPOCH FROM (purchased_at - TIMESTAMP '{TRENDING_EPOCH}')) * {DECAY_RATE!r} AS x
+                FROM {SCHEMA_NAME}.purchases
+            ) sales
+        ) scored
+        GROUP BY book_id, max_x
+    ''')
+    return cursor.rowcount
+
+
+def handle(event: Dict[str, Any], method: str) -> Dict[str, Any]:
+    '''
+    Business: Пересчёт рейтинга бестселлеров и трендов администратором
+    Args: event с заголовком X-User-Id, method POST
+    Returns: HTTP response с числом пересчитанных книг
+    '''
+    headers = event.get('headers', {})
+    user_id = headers.get('x-user-id') or headers.get('X-User-Id')
+    
+    if method != 'POST':
+        return {
+            'statusCode': 405,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+    
+    if user_id != '1':
+        return {
+            'statusCode': 403,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Только администратор может пересчитывать рейтинг'}),
+            'isBase64Encoded': False
+        }
+    
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        books_count = rebuild(cursor)
+        conn.commit()
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'booksCount': books_count}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,460 @@
+import json
+from typing import Dict, Any, List
+
+import cover_variants
+from db import connect, SCHEMA_NAME
+
+# sort=trending|bestsellers читают материализованную популярность из book_popularity
+LIST_ORDERING = {
+    'new': 'b.created_at DESC',
+    'trending': 'p.trending_score DESC NULLS LAST, b.created_at DESC',
+    'bestsellers': 'p.sales_count DESC NULLS LAST, b.created_at DESC'
+}
+
+MAX_IDS_PER_REQUEST = 100
+
+
+def parse_ids(raw_ids: str) -> List[int]:
+    '''
+    Business: Разбирает параметр ids=1,2,3 без дублей с сохранением порядка
+    Args: raw_ids - строка id через запятую
+    Returns: список id; ValueError при нечисловом id или превышении MAX_IDS_PER_REQUEST
+    '''
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw_ids.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError('Invalid ids')
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise ValueError(f'Too many ids, max {MAX_IDS_PER_REQUEST}')
+    return ids
+
+
+def load_books(cursor, ids: List[int]):
+    '''
+    Business: Загружает книги с форматами по списку id двумя запросами
+    Args: cursor - курсор БД, ids - id книг в нужном порядке
+    Returns: (книги в порядке ids без отсутствующих, {id: строка books})
+    '''
+    # Две выборки на любое число id: книги и все их форматы через = ANY
+    cursor.execute(f'''
+        SELECT id, title, author, genre, rating, price, discount_price, cover, description, 
+               badges, ebook_price, ebook_discount_price, is_adult_content, cover_version
+        FROM {SCHEMA_NAME}.books WHERE id = ANY(%s)
+    ''', (ids,))
+    rows = {row[0]: row for row in cursor.fetchall()}
+    
+    cursor.execute(f'''
+        SELECT book_id, format FROM {SCHEMA_NAME}.book_formats
+        WHERE book_id = ANY(%s) ORDER BY id
+    ''', (ids,))
+    formats_by_book: Dict[int, List[Dict[str, str]]] = {}
+    for f in cursor.fetchall():
+        formats_by_book.setdefault(f[0], []).append({'format': f[1], 'fileUrl': ''})
+    
+    books = []
+    for requested_id in ids:
+        row = rows.get(requested_id)
+        if not row:
+            continue
+        books.append({
+            'id': row[0],
+            'title': row[1],
+            'author': row[2],
+            'genre': row[3],
+            'rating': float(row[4]),
+            'price': float(row[5]),
+            'discountPrice': float(row[6]) if row[6] else None,
+            'cover': row[7],
+            'description': row[8],
+            'badges': row[9] or [],
+            'ebookPrice': float(row[10]) if row[10] else None,
+            'ebookDiscountPrice': float(row[11]) if row[11] else None,
+            'isAdultContent': row[12],
+            'coverVariants': cover_variants.variant_urls(row[0], row[13]),
+            'formats': formats_by_book.get(row[0], [])
+        })
+    return books, rows
+
+
+def handle(event: Dict[str, Any], method: str) -> Dict[str, Any]:
+    '''
+    Business: API каталога книг - получение, добавление, обновление, удаление, статистика
+    Args: event с httpMethod (GET/POST/PUT/DELETE), body для POST/PUT, queryStringParameters
+    Returns: HTTP response с данными книг или статусом операции
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        if method == 'GET':
+            params = event.get('queryStringParameters') or {}
+            book_id = params.get('id')
+            stats = params.get('stats')
+            
+            if stats == 'true':
+                import parallel_queries
+                
+                # Пять независимых агрегатов: на пуле соединений время маршрута близко к самому долгому из них
+                results, timings = parallel_queries.run_queries(cursor, {
+                    'sales-by-week': (f'''
+                        SELECT 
+                            DATE_TRUNC('week', purchased_at) as week,
+                            COUNT(*) as count,
+                            COALESCE(SUM(price), 0) as revenue
+                        FROM {SCHEMA_NAME}.purchases
+                        WHERE purchased_at >= CURRENT_DATE - INTERVAL '12 weeks'
+                        GROUP BY week
+                        ORDER BY week ASC
+                    ''', ()),
+                    'sales-by-day': (f'''
+                        SELECT 
+                            DATE(purchased_at) as date,
+                            COUNT(*) as count,
+                            COALESCE(SUM(price), 0) as revenue
+                        FROM {SCHEMA_NAME}.purchases
+                        WHERE purchased_at >= CURRENT_DATE - INTERVAL '30 days'
+                        GROUP BY DATE(purchased_at)
+                        ORDER BY date ASC
+                    ''', ()),
+                    'purchases-count': (f'SELECT COUNT(*) FROM {SCHEMA_NAME}.purchases', ()),
+                    'revenue': (f'SELECT COALESCE(SUM(price), 0) FROM {SCHEMA_NAME}.purchases', ()),
+                    'books-count': (f'SELECT COUNT(*) FROM {SCHEMA_NAME}.books', ())
+                })
+                
+                sales_by_day = []
+                for row in results['sales-by-day']:
+                    sales_by_day.append({
+                        'date': row[0].isoformat(),
+                        'count': row[1],
+                        'revenue': float(row[2])
+                    })
+                
+                sales_by_week = []
+                for row in results['sales-by-week']:
+                    sales_by_week.append({
+                        'week': row[0].isoformat(),
+                        'count': row[1],
+                        'revenue': float(row[2])
+                    })
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Server-Timing': parallel_queries.server_timing(timings)
+                    },
+                    'body': json.dumps({
+                        'booksCount': results['books-count'][0][0],
+                        'purchasesCount': results['purchases-count'][0][0],
+                        'totalRevenue': float(results['revenue'][0][0]),
+                        'salesByDay': sales_by_day,
+                        'salesByWeek': sales_by_week
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if params.get('ids') is not None:
+                try:
+                    ids = parse_ids(params['ids'])
+                except ValueError as error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': str(error)}),
+                        'isBase64Encoded': False
+                    }
+                
+                books, rows = load_books(cursor, ids)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'books': books,
+                        'missingIds': [requested_id for requested_id in ids if requested_id not in rows]
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if params.get('limit') is not None:
+                import catalog_snapshot
+                from db import CONSISTENCY_HEADER
+                
+                try:
+                    query = catalog_snapshot.parse_query(params)
+                except ValueError as error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': str(error)}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Сортировка, фильтры и пагинация - по снимку в памяти, из БД читается только сама страница
+                headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+                snapshot = catalog_snapshot.get_snapshot(conn, force_check=CONSISTENCY_HEADER.lower() in headers)
+                page_ids, total = snapshot.select(query)
+                books, _ = load_books(cursor, page_ids) if page_ids else ([], {})
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({
+                        'books': books,
+                        'total': total,
+                        'limit': query['limit'],
+                        'offset': query['offset']
+                    }),
+                    'isBase64Encoded': False
+                }
+            
+            if book_id:
+                import parallel_queries
+                
+                # Книга и её форматы не зависят друг от друга и читаются параллельно
+                results, timings = parallel_queries.run_queries(cursor, {
+                    'book': (f'''
+                        SELECT id, title, author, genre, rating, price, discount_price, cover, description, 
+                               badges, ebook_text, ebook_price, ebook_discount_price, is_adult_content, cover_version
+                        FROM {SCHEMA_NAME}.books WHERE id = %s
+                    ''', (book_id,)),
+                    'formats': (f'SELECT format FROM {SCHEMA_NAME}.book_formats WHERE book_id = %s', (book_id,))
+                })
+                row = results['book'][0] if results['book'] else None
+                
+                if not row:
+                    return {
+                        'statusCode': 404,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': 'Book not found'}),
+                        'isBase64Encoded': False
+                    }
+                
+                # Сам файл выдаётся только через action=download после проверки покупки
+                formats = [{'format': f[0], 'fileUrl': ''} for f in results['formats']]
+                
+                book = {
+                    'id': row[0],
+                    'title': row[1],
+                    'author': row[2],
+                    'genre': row[3],
+                    'rating': float(row[4]),
+                    'price': float(row[5]),
+                    'discountPrice': float(row[6]) if row[6] else None,
+                    'cover': row[7],
+                    'description': row[8],
+                    'badges': row[9] or [],
+                    'ebookText': row[10],
+                    'ebookPrice': float(row[11]) if row[11] else None,
+                    'ebookDiscountPrice': float(row[12]) if row[12] else None,
+                    'isAdultContent': row[13],
+                    'coverVariants': cover_variants.variant_urls(row[0], row[14]),
+                    'formats': formats
+                }
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Server-Timing': parallel_queries.server_timing(timings)
+                    },
+                    'body': json.dumps({'book': book}),
+                    'isBase64Encoded': False
+                }
+            else:
+                order_by = LIST_ORDERING.get(params.get('sort'), LIST_ORDERING['new'])
+                cursor.execute(f'''
+                    SELECT b.id, b.title, b.author, b.genre, b.rating, b.price, b.discount_price, b.cover, b.description, 
+                           b.badges, b.ebook_price, b.ebook_discount_price, b.is_adult_content, b.cover_version
+                    FROM {SCHEMA_NAME}.books b
+                    LEFT JOIN {SCHEMA_NAME}.book_popularity p ON p.book_id = b.id
+                    ORDER BY {order_by}
+                ''')
+                rows = cursor.fetchall()
+                
+                books = []
+                for row in rows:
+                    cursor.execute(f'SELECT format FROM {SCHEMA_NAME}.book_formats WHERE book_id = %s', (row[0],))
+                    formats = [{'format': f[0], 'fileUrl': ''} for f in cursor.fetchall()]
+                    
+                    books.append({
+                        'id': row[0],
+                        'title': row[1],
+                        'author': row[2],
+                        'genre': row[3],
+                        'rating': float(row[4]),
+                        'price': float(row[5]),
+                        'discountPrice': float(row[6]) if row[6] else None,
+                        'cover': row[7],
+                        'description': row[8],
+                        'badges': row[9] or [],
+                        'ebookPrice': float(row[10]) if row[10] else None,
+                        'ebookDiscountPrice': float(row[11]) if row[11] else None,
+                        'isAdultContent': row[12],
+                        'coverVariants': cover_variants.variant_urls(row[0], row[13]),
+                        'formats': formats
+                    })
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'books': books}),
+                    'isBase64Encoded': False
+                }
+        
+        elif method == 'POST':
+            body_data = json.loads(event.get('body', '{}'))
+            
+            cursor.execute(f'''
+                INSERT INTO {SCHEMA_NAME}.books (title, author, genre, rating, price, discount_price, cover, description, 
+                                 badges, ebook_text, ebook_price, ebook_discount_price, is_adult_content)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            ''', (
+                body_data['title'],
+                body_data['author'],
+                body_data['genre'],
+                body_data.get('rating', 0),
+                body_data['price'],
+                body_data.get('discountPrice'),
+                body_data.get('cover', ''),
+                body_data.get('description', ''),
+                body_data.get('badges', []),
+                body_data.get('ebookText'),
+                body_data.get('ebookPrice'),
+                body_data.get('ebookDiscountPrice'),
+                body_data.get('isAdultContent', False)
+            ))
+            
+            book_id = cursor.fetchone()[0]
+            
+            for fmt in body_data.get('formats', []):
+                cursor.execute(f'''
+                    INSERT INTO {SCHEMA_NAME}.book_formats (book_id, format, file_url)
+                    VALUES (%s, %s, %s)
+                ''', (book_id, fmt['format'], fmt['fileUrl']))
+            
+            import catalog_version
+            catalog_version.bump_version(cursor)
+            conn.commit()
+            catalog_version.invalidate()
+            
+            # Уменьшенные обложки создаются один раз при сохранении, а не при каждом показе;
+            # cover_version появляется у книги только вместе с ними
+            cover_variants.generate_variants(cursor, book_id, body_data.get('cover', ''))
+            conn.commit()
+            
+            return {
+                'statusCode': 201,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'id': book_id, 'message': 'Book created'}),
+                'isBase64Encoded': False
+            }
+        
+        elif method == 'PUT':
+            body_data = json.loads(event.get('body', '{}'))
+            book_id = body_data.get('id')
+            
+            if not book_id:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Book ID required'}),
+                    'isBase64Encoded': False
+                }
+            
+            cursor.execute(
+                f'SELECT cover IS DISTINCT FROM %s FROM {SCHEMA_NAME}.books WHERE id = %s',
+                (body_data.get('cover', ''), book_id)
+            )
+            previous = cursor.fetchone()
+            
+            cursor.execute(f'''
+                UPDATE {SCHEMA_NAME}.books 
+                SET title = %s, author = %s, genre = %s, rating = %s, price = %s, discount_price = %s,
+                    cover = %s, description = %s, badges = %s, ebook_text = %s,
+                    ebook_price = %s, ebook_discount_price = %s, is_adult_content = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (
+                body_data['title'],
+                body_data['author'],
+                body_data['genre'],
+                body_data.get('rating', 0),
+                body_data['price'],
+                body_data.get('discountPrice'),
+                body_data.get('cover', ''),
+                body_data.get('description', ''),
+                body_data.get('badges', []),
+                body_data.get('ebookText'),
+                body_data.get('ebookPrice'),
+                body_data.get('ebookDiscountPrice'),
+                body_data.get('isAdultContent', False),
+                book_id
+            ))
+            
+            cursor.execute(f'DELETE FROM {SCHEMA_NAME}.book_formats WHERE book_id = %s', (book_id,))
+            
+            for fmt in body_data.get('formats', []):
+                cursor.execute(f'''
+                    INSERT INTO {SCHEMA_NAME}.book_formats (book_id, format, file_url)
+                    VALUES (%s, %s, %s)
+                ''', (book_id, fmt['format'], fmt['fileUrl']))
+            
+            import catalog_version
+            catalog_version.bump_version(cursor)
+            conn.commit()
+            catalog_version.invalidate()
+            
+            # cover_version меняется только вместе с новыми копиями или сбрасывается в NULL
+            if previous and previous[0]:
+                cover_variants.generate_variants(cursor, int(book_id), body_data.get('cover', ''))
+                conn.commit()
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'message': 'Book updated'}),
+                'isBase64Encoded': False
+            }
+        
+        elif method == 'DELETE':
+            params = event.get('queryStringParameters') or {}
+            book_id = params.get('id')
+            
+            if not book_id:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Book ID required'}),
+                    'isBase64Encoded': False
+                }
+            
+            cursor.execute(f'DELETE FROM {SCHEMA_NAME}.book_formats WHERE book_id = %s', (book_id,))
+            cursor.execute(f'DELETE FROM {SCHEMA_NAME}.book_cover_variants WHERE book_id = %s', (book_id,))
+            cursor.execute(f'DELETE FROM {SCHEMA_NAME}.books WHERE id = %s', (book_id,))
+            import catalog_version
+            catalog_version.bump_version(cursor)
+            conn.commit()
+            catalog_version.invalidate()
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'message': 'Book deleted'}),
+                'isBase64Encoded': False
+            }
+        
+
+        return {
+            'statusCode': 405,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+        
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,254 @@
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+import catalog_version
+from db import SCHEMA_NAME
+
+# Сортировки страниц каталога; new/trending/bestsellers совпадают с LIST_ORDERING
+SNAPSHOT_SORTS = ('new', 'trending', 'bestsellers', 'price-asc', 'price-desc', 'rating')
+# Версия каталога (catalog_version) проверяется не чаще раза в секунду; запись этого экземпляра
+# или заголовок X-Consistency-Token заставляют проверить её сразу
+VERSION_CHECK_SECONDS = 1.0
+# Продажи меняют популярность постоянно, поэтому она перечитывается по времени, а не по версии
+POPULARITY_REFRESH_SECONDS = 60
+SNAPSHOT_ITERSIZE = 10000
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+FLAG_ADULT = 1
+FLAG_DISCOUNT = 2
+FLAG_EBOOK = 4
+
+
+class CatalogSnapshot:
+    '''
+    Business: Колоночный снимок каталога в памяти экземпляра: массивы NumPy вместо словаря на книгу
+    Args: version - версия каталога из catalog_versions, остальные - столбцы, упорядоченные по id
+    Returns: снимок, отвечающий на сортировку, фильтры и пагинацию векторными операциями
+    '''
+
+    def __init__(self, version: int, ids, prices, ratings, genre_codes, genres: List[str], flags, created_at):
+        self.version = version
+        self.ids = ids
+        # Цена, которую видит покупатель: со скидкой, если она есть
+        self.prices = prices
+        self.ratings = ratings
+        self.genre_codes = genre_codes
+        self.genres = genres
+        self.genre_index = {genre: code for code, genre in enumerate(genres)}
+        self.flags = flags
+        self.created_at = created_at
+        # Книга без строки в book_popularity идёт последней, как NULLS LAST в SQL
+        self.sales = np.full(len(ids), -1, dtype=np.int32)
+        self.trending = np.full(len(ids), -np.inf, dtype=np.float64)
+        self.popularity_loaded_at = 0.0
+        self.orders: Dict[str, np.ndarray] = {}
+
+    def with_popularity(self, book_ids, sales, trending) -> 'CatalogSnapshot':
+        snapshot = CatalogSnapshot(
+            self.version, self.ids, self.prices, self.ratings, self.genre_codes,
+            self.genres, self.flags, self.created_at
+        )
+        positions = np.searchsorted(self.ids, book_ids)
+        known = positions < len(self.ids)
+        known[known] = self.ids[positions[known]] == book_ids[known]
+        snapshot.sales[positions[known]] = sales[known]
+        snapshot.trending[positions[known]] = trending[known]
+        snapshot.popularity_loaded_at = time.monotonic()
+        # Сортировки по цене, рейтингу и новизне от популярности не зависят
+        snapshot.orders = {sort: order for sort, order in self.orders.items() if sort not in ('trending', 'bestsellers')}
+        return snapshot
+
+    def order(self, sort: str) -> np.ndarray:
+        '''Перестановка всех книг для сортировки; считается один раз на снимок'''
+        order = self.orders.get(sort)
+        if order is None:
+            # lexsort сортирует по последнему ключу, предыдущие разрешают равенства
+            tie_breakers = (-self.ids, -self.created_at)
+            if sort == 'trending':
+                keys = tie_breakers + (-self.trending,)
+            elif sort == 'bestsellers':
+                keys = tie_breakers + (-self.sales,)
+            elif sort == 'price-asc':
+                keys = tie_breakers + (self.prices,)
+            elif sort == 'price-desc':
+                keys = tie_breakers + (-self.prices,)
+            elif sort == 'rating':
+                keys = tie_breakers + (-self.ratings,)
+            else:
+                keys = tie_breakers
+            order = self.orders[sort] = np.lexsort(keys)
+        return order
+
+    def select(self, query: Dict[str, Any]) -> Tuple[List[int], int]:
+        '''
+        Business: Выбирает страницу книг по фильтрам и сортировке без обращения к БД
+        Args: query - результат parse_query
+        Returns: (id книг страницы по порядку, число книг, подходящих под фильтры)
+        '''
+        mask = np.ones(len(self.ids), dtype=bool)
+        if query['genre'] is not None:
+            code = self.genre_index.get(query['genre'])
+            if code is None:
+                return [], 0
+            mask &= self.genre_codes == code
+        if query['minPrice'] is not None:
+            mask &= self.prices >= query['minPrice']
+        if query['maxPrice'] is not None:
+            mask &= self.prices <= query['maxPrice']
+        if query['minRating'] is not None:
+            mask &= self.ratings >= query['minRating']
+        if not query['adult']:
+            mask &= (self.flags & FLAG_ADULT) == 0
+        if query['discount']:
+            mask &= (self.flags & FLAG_DISCOUNT) != 0
+        if query['ebook']:
+            mask &= (self.flags & FLAG_EBOOK) != 0
+
+        order = self.order(query['sort'])
+        matching = order[mask[order]]
+        page = matching[query['offset']:query['offset'] + query['limit']]
+        return self.ids[page].tolist(), len(matching)
+
+
+def parse_query(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Разбирает параметры страницы каталога
+    Args: params с limit, offset, sort, genre, minPrice, maxPrice, minRating, adult, discount, ebook
+    Returns: словарь запроса; ValueError при неверном значении
+    '''
+    def number(name: str) -> Optional[float]:
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError(f'Invalid {name}')
+
+    try:
+        limit = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+        offset = int(params.get('offset') or 0)
+    except ValueError:
+        raise ValueError('Invalid limit or offset')
+    if not 1 <= limit <= MAX_PAGE_SIZE or offset < 0:
+        raise ValueError(f'limit must be 1..{MAX_PAGE_SIZE}, offset must not be negative')
+
+    sort = params.get('sort') or 'new'
+    if sort not in SNAPSHOT_SORTS:
+        raise ValueError(f"Unsupported sort, use one of: {', '.join(SNAPSHOT_SORTS)}")
+
+    return {
+        'limit': limit,
+        'offset': offset,
+        'sort': sort,
+        'genre': params.get('genre') or None,
+        'minPrice': number('minPrice'),
+        'maxPrice': number('maxPrice'),
+        'minRating': number('minRating'),
+        'adult': params.get('adult') != 'false',
+        'discount': params.get('discount') == 'true',
+        'ebook': params.get('ebook') == 'true'
+    }
+
+
+def build(conn, version: int) -> CatalogSnapshot:
+    '''
+    Business: Читает столбцы каталога пачками в типизированные массивы и собирает снимок
+    Args: conn - соединение с БД, version - версия, прочитанная до начала выборки
+    Returns: CatalogSnapshot с уже загруженной популярностью
+    '''
+    ids, prices, ratings, codes, flags, created_at = (
+        array('q'), array('d'), array('f'), array('i'), array('B'), array('q')
+    )
+    genre_index: Dict[str, int] = {}
+
+    # Серверный курсор: в памяти одновременно не больше SNAPSHOT_ITERSIZE строк-кортежей
+    snapshot_cursor = conn.cursor(name='catalog_snapshot')
+    snapshot_cursor.itersize = SNAPSHOT_ITERSIZE
+    snapshot_cursor.execute(f'''
+        SELECT id, COALESCE(discount_price, price)::float8, COALESCE(rating, 0)::float4, genre,
+               COALESCE(is_adult_content, FALSE), discount_price IS NOT NULL, ebook_price IS NOT NULL,
+               COALESCE((EXTRACT(EPOCH FROM created_at) * 1000000)::bigint, 0)
+        FROM {SCHEMA_NAME}.books
+        ORDER BY id
+    ''')
+    for row in snapshot_cursor:
+        ids.append(row[0])
+        prices.append(row[1])
+        ratings.append(row[2])
+        code = genre_index.get(row[3])
+        if code is None:
+            code = genre_index[sys.intern(row[3])] = len(genre_index)
+        codes.append(code)
+        flags.append((FLAG_ADULT if row[4] else 0) | (FLAG_DISCOUNT if row[5] else 0) | (FLAG_EBOOK if row[6] else 0))
+        created_at.append(row[7])
+    snapshot_cursor.close()
+
+    snapshot = CatalogSnapshot(
+        version,
+        np.frombuffer(ids, dtype=np.int64),
+        np.frombuffer(prices, dtype=np.float64),
+        np.frombuffer(ratings, dtype=np.float32),
+        np.frombuffer(codes, dtype=np.int32),
+        list(genre_index),
+        np.frombuffer(flags, dtype=np.uint8),
+        np.frombuffer(created_at, dtype=np.int64)
+    )
+    return load_popularity(conn, snapshot)
+
+
+def load_popularity(conn, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f'SELECT book_id, sales_count, trending_score FROM {SCHEMA_NAME}.book_popularity')
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    columns = np.array(rows, dtype=np.float64).reshape(-1, 3)
+    return snapshot.with_popularity(columns[:, 0].astype(np.int64), columns[:, 1].astype(np.int32), columns[:, 2])
+
+
+_snapshot: Optional[CatalogSnapshot] = None
+_checked_at = 0.0
+_seen_local_writes = 0
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot(conn, force_check: bool = False) -> CatalogSnapshot:
+    '''
+    Business: Снимок каталога тёплого экземпляра, пересобранный, если версия в БД изменилась
+    Args: conn - соединение маршрута, force_check - проверить версию, не дожидаясь VERSION_CHECK_SECONDS
+    Returns: актуальный CatalogSnapshot; сборку выполняет один поток, остальные ждут её
+    '''
+    global _snapshot, _checked_at, _seen_local_writes
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        now = time.monotonic()
+        local_writes = catalog_version.local_writes
+        if snapshot is not None and not force_check and local_writes == _seen_local_writes \
+                and now - _checked_at < VERSION_CHECK_SECONDS:
+            return snapshot
+
+        cursor = conn.cursor()
+        try:
+            version = catalog_version.read_version(cursor)
+        finally:
+            cursor.close()
+        if snapshot is None or snapshot.version != version:
+            started = time.perf_counter()
+            snapshot = build(conn, version)
+            print(f'Catalog snapshot v{version}: {len(snapshot.ids)} books in {time.perf_counter() - started:.2f}s')
+        elif now - snapshot.popularity_loaded_at >= POPULARITY_REFRESH_SECONDS:
+            snapshot = load_popularity(conn, snapshot)
+        _snapshot = snapshot
+        _checked_at = now
+        _seen_local_writes = local_writes
+        return snapshot
+
@@ -0,0 +1,31 @@
+from db import SCHEMA_NAME
+
+# Число записей каталога, сделанных этим экземпляром: снимок каталога сверяет версию с БД сразу,
+# как только оно изменилось. Модуль не импортирует numpy, чтобы запись не платила за снимок
+local_writes = 0
+
+
+def read_version(cursor) -> int:
+    cursor.execute(f"SELECT version FROM {SCHEMA_NAME}.catalog_versions WHERE catalog = 'books'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_version(cursor) -> None:
+    '''
+    Business: Отмечает изменение каталога для снимков всех экземпляров
+    Args: cursor - курсор транзакции, изменившей books (версия меняется вместе с ней)
+    Returns: None; после commit вызывающий сообщает об изменении своему снимку через invalidate
+    '''
+    cursor.execute(f'''
+        UPDATE {SCHEMA_NAME}.catalog_versions
+        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE catalog = 'books'
+    ''')
+
+
+def invalidate() -> None:
+    '''Следующий запрос страницы сверит версию с БД сразу'''
+    global local_writes
+
+    local_writes += 1
@@ -0,0 +1,237 @@
+import base64
+import hashlib
+import io
+import json
+from typing import Dict, Any, Optional
+
+from db import connect, SCHEMA_NAME
+
+COVER_WIDTHS = (160, 320, 640)
+# Формат -> (формат Pillow, Content-Type, качество)
+COVER_FORMATS = {
+    'webp': ('WEBP', 'image/webp', 80),
+    'jpeg': ('JPEG', 'image/jpeg', 82)
+}
+MAX_COVER_BYTES = 20 * 1024 * 1024
+COVER_FETCH_TIMEOUT_SECONDS = 10
+
+
+class CoverError(Exception):
+    pass
+
+
+def cover_version(cover: Optional[str]) -> Optional[str]:
+    '''
+    Business: Версия обложки для URL уменьшенных копий - меняется вместе с исходной обложкой
+    Args: cover - data:image-адрес или http(s)-ссылка на обложку
+    Returns: 12 символов md5 или None, если обложку нельзя уменьшить (пусто, svg-заглушка фронтенда)
+    '''
+    if not cover or not cover.startswith(('data:image/', 'http://', 'https://')):
+        return None
+    return hashlib.md5(cover.encode()).hexdigest()[:12]
+
+
+def variant_urls(book_id: int, version: Optional[str]) -> Dict[str, Dict[str, str]]:
+    '''
+    Business: Карта уменьшенных обложек для ответов каталога
+    Args: book_id, version - cover_version книги
+    Returns: {формат: {ширина: относительный URL функции books}}; пустая карта без версии
+    '''
+    if not version:
+        return {}
+    return {
+        cover_format: {
+            str(width): f'?action=cover&bookId={book_id}&width={width}&format={cover_format}&v={version}'
+            for width in COVER_WIDTHS
+        }
+        for cover_format in COVER_FORMATS
+    }
+
+
+def read_cover(cover: str) -> bytes:
+    # urllib.request тянет за собой http.client и email - каталогу, которому нужны
+    # только variant_urls и cover_version, он не нужен на холодном старте
+    import urllib.request
+
+    if cover.startswith('data:'):
+        header, _, payload = cover.partition(',')
+        if not header.endswith(';base64'):
+            raise CoverError('Only base64 data URLs are supported')
+        return base64.b64decode(payload)
+
+    try:
+        with urllib.request.urlopen(cover, timeout=COVER_FETCH_TIMEOUT_SECONDS) as response:
+            data = response.read(MAX_COVER_BYTES + 1)
+    except (OSError, ValueError) as error:
+        raise CoverError(f'Failed to fetch cover: {error}')
+    if len(data) > MAX_COVER_BYTES:
+        raise CoverError(f'Cover is larger than {MAX_COVER_BYTES} bytes')
+    return data
+
+
+def open_cover(data: bytes):
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        raise CoverError(f'Unsupported cover image: {error}')
+    # Фото с телефона хранят поворот в EXIF - применяем его до уменьшения
+    return ImageOps.exif_transpose(image)
+
+
+def render_variant(image, width: int, cover_format: str) -> bytes:
+    '''
+    Business: Уменьшает обложку до ширины и пережимает в WebP или JPEG
+    Args: image - открытое изображение Pillow, width - целевая ширина, cover_format - ключ COVER_FORMATS
+    Returns: байты изображения; обложка уже нужной ширины не увеличивается
+    '''
+    from PIL import Image
+
+    pillow_format, _, quality = COVER_FORMATS[cover_format]
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    variant = image.convert('RGBA' if has_alpha and cover_format == 'webp' else 'RGB')
+    if variant.width > width:
+        height = max(1, round(variant.height * width / variant.width))
+        variant = variant.resize((width, height), Image.LANCZOS)
+
+    output = io.BytesIO()
+    if cover_format == 'jpeg':
+        variant.save(output, pillow_format, quality=quality, optimize=True, progressive=True)
+    else:
+        variant.save(output, pillow_format, quality=quality, method=4)
+    return output.getvalue()
+
+
+def generate_variants(cursor, book_id: int, cover: str) -> bool:
+    '''
+    Business: Создаёт все уменьшенные обложки книги при сохранении и заменяет прежние
+    Args: cursor - курсор открытой транзакции, book_id, cover - исходная обложка
+    Returns: True, если копии записаны; False, если обложку не удалось прочитать.
+             cover_version книги записывается только вместе с копиями, иначе сбрасывается в NULL
+    '''
+    version = cover_version(cover)
+    cursor.execute(f'DELETE FROM {SCHEMA_NAME}.book_cover_variants WHERE book_id = %s', (book_id,))
+    image = None
+    if version:
+        try:
+            image = open_cover(read_cover(cover))
+        except CoverError as error:
+            print(f'Cover variants skipped for book {book_id}: {error}')
+    if image is None:
+        # Без версии каталог не отдаёт variant_urls и фронтенд показывает исходную обложку
+        cursor.execute(f'UPDATE {SCHEMA_NAME}.books SET cover_version = NULL WHERE id = %s', (book_id,))
+        return False
+
+    for width in COVER_WIDTHS:
+        for cover_format in COVER_FORMATS:
+            cursor.execute(f'''
+                INSERT INTO {SCHEMA_NAME}.book_cover_variants (book_id, width, format, version, content)
+                VALUES (%s, %s, %s, %s, %s)
+            ''', (book_id, width, cover_format, version, render_variant(image, width, cover_format)))
+    cursor.execute(f'UPDATE {SCHEMA_NAME}.books SET cover_version = %s WHERE id = %s', (version, book_id))
+    return True
+
+
+def serve(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Отдаёт уменьшенную обложку, при отсутствии создаёт её из исходной и сохраняет
+    Args: params с bookId, width (из COVER_WIDTHS), format (webp/jpeg), v - версия обложки
+    Returns: HTTP response с изображением в base64, 400 для неверных параметров, 404 без обложки
+    '''
+    book_id = params.get('bookId')
+    width = params.get('width')
+    cover_format = params.get('format', 'webp')
+
+    if not book_id or not str(book_id).isdigit() or not str(width).isdigit() \
+            or int(width) not in COVER_WIDTHS or cover_format not in COVER_FORMATS:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({
+                'error': 'bookId, width and format required',
+                'widths': list(COVER_WIDTHS),
+                'formats': list(COVER_FORMATS)
+            }),
+            'isBase64Encoded': False
+        }
+
+    book_id, width = int(book_id), int(width)
+    conn = connect()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'''
+            SELECT b.cover_version, v.version, v.content
+            FROM {SCHEMA_NAME}.books b
+            LEFT JOIN {SCHEMA_NAME}.book_cover_variants v
+                ON v.book_id = b.id AND v.width = %s AND v.format = %s
+            WHERE b.id = %s
+        ''', (width, cover_format, book_id))
+        row = cursor.fetchone()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not row or not row[0]:
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Cover not found'}),
+            'isBase64Encoded': False
+        }
+
+    version, stored_version, content = row
+    if stored_version != version:
+        # Копии нет (или она от прежней обложки) - создаём на основной БД, даже если чтение шло с реплики
+        conn = connect(readonly=False)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'SELECT cover, cover_version FROM {SCHEMA_NAME}.books WHERE id = %s', (book_id,))
+            book = cursor.fetchone()
+            # Книгу могли удалить или снять обложку между двумя запросами
+            if not book or not book[1]:
+                raise CoverError('Cover was removed')
+            cover, version = book
+            content = render_variant(open_cover(read_cover(cover)), width, cover_format)
+            cursor.execute(f'''
+                INSERT INTO {SCHEMA_NAME}.book_cover_variants (book_id, width, format, version, content)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (book_id, width, format)
+                DO UPDATE SET version = EXCLUDED.version, content = EXCLUDED.content, created_at = CURRENT_TIMESTAMP
+            ''', (book_id, width, cover_format, version, content))
+            conn.commit()
+        except CoverError as error:
+            print(f'Cover variant failed for book {book_id}: {error}')
+            # Версия могла остаться от миграции V0016, которая не проверяла обложки, - снимаем её,
+            # чтобы каталог перестал ссылаться на копии, которые не создать
+            cursor.execute(f'''
+                UPDATE {SCHEMA_NAME}.books SET cover_version = NULL
+                WHERE id = %s AND cover_version = %s
+            ''', (book_id, version))
+            conn.commit()
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Cover not found'}),
+                'isBase64Encoded': False
+            }
+        finally:
+            cursor.close()
+            conn.close()
+
+    # URL с актуальной версией неизменен навсегда; без неё кэшируем ненадолго
+    cache_control = 'public, max-age=31536000, immutable' if params.get('v') == version else 'public, max-age=300'
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': COVER_FORMATS[cover_format][1],
+            'Cache-Control': cache_control,
+            'ETag': f'"{version}-{width}-{cover_format}"',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': base64.b64encode(bytes(content)).decode('ascii'),
+        'isBase64Encoded': True
+    }
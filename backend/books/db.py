@@ -0,0 +1,245 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from typing import Dict, Any, Optional
+
+SCHEMA_NAME = 't_p48697888_litres_site_creation'
+
+# DB_POOL_SIZE > 0 включает пул соединений, живущий в тёплом контейнере;
+# объединённый шлюз backend/api включает его по умолчанию
+POOL_IDLE_CHECK_SECONDS = 30
+# DATABASE_READ_URL - одна или несколько (через запятую) строк подключения к репликам;
+# DB_READ_POLICY - round-robin (по умолчанию) или random
+REPLICA_RETRY_SECONDS = 30
+CONSISTENCY_HEADER = 'X-Consistency-Token'
+
+_pools: Dict[str, 'ConnectionPool'] = {}
+_pools_lock = threading.Lock()
+_replica_turn = 0
+_replica_down_until: Dict[str, float] = {}
+_replica_lsn: Dict[str, int] = {}
+# (только чтение, минимальный LSN) текущего запроса, задаётся bind_request
+_request: contextvars.ContextVar = contextvars.ContextVar('db_request', default=(False, None))
+
+
+class ConnectionPool:
+    '''
+    Business: Пул соединений одной базы: не больше size соединений, простаивающие перепроверяются
+    Args: dsn - строка подключения, size - предельное число соединений
+    Returns: пул, выдающий PooledConnection
+    '''
+
+    def __init__(self, dsn: str, size: int):
+        self.dsn = dsn
+        self.idle = []
+        self.last_used = {}
+        self.lock = threading.Lock()
+        # Не больше size соединений одновременно: лишние потоки ждут освобождения
+        self.slots = threading.BoundedSemaphore(size)
+
+    def acquire(self, wait: bool = True) -> Optional['PooledConnection']:
+        if not self.slots.acquire(blocking=wait):
+            return None
+        try:
+            return PooledConnection(self, self._open())
+        except Exception:
+            self.slots.release()
+            raise
+
+    def _open(self):
+        import psycopg2
+
+        conn = None
+        with self.lock:
+            while self.idle:
+                candidate = self.idle.pop()
+                idle_seconds = time.monotonic() - self.last_used.pop(id(candidate), 0)
+                if candidate.closed:
+                    continue
+                if idle_seconds <= POOL_IDLE_CHECK_SECONDS:
+                    return candidate
+                conn = candidate
+                break
+
+        # Соединение могло быть закрыто сервером, пока контейнер простаивал
+        if conn is not None:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                conn.rollback()
+                return conn
+            except Exception:
+                conn.close()
+        return psycopg2.connect(self.dsn)
+
+    def release(self, conn) -> None:
+        try:
+            if not conn.closed:
+                conn.rollback()
+        except Exception:
+            conn.close()
+        try:
+            if not conn.closed:
+                with self.lock:
+                    self.last_used[id(conn)] = time.monotonic()
+                    self.idle.append(conn)
+        finally:
+            self.slots.release()
+
+
+class PooledConnection:
+    '''
+    Business: Соединение из пула, которое при close() возвращается в пул, а не закрывается
+    Args: pool - ConnectionPool, conn - соединение psycopg2
+    Returns: обёртка с интерфейсом соединения psycopg2
+    '''
+
+    def __init__(self, pool: ConnectionPool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.release(conn)
+
+
+def _open(dsn: str, wait: bool = True):
+    pool_size = int(os.environ.get('DB_POOL_SIZE') or 0)
+    if pool_size <= 0:
+        import psycopg2
+        return psycopg2.connect(dsn)
+
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = _pools[dsn] = ConnectionPool(dsn, pool_size)
+    return pool.acquire(wait)
+
+
+def parse_lsn(value: Optional[str]) -> Optional[int]:
+    '''
+    Business: Переводит LSN Postgres вида 16/B374D848 в число для сравнения
+    Args: value - LSN или токен согласованности от клиента
+    Returns: число или None для пустого/неверного значения
+    '''
+    high, separator, low = (value or '').strip().partition('/')
+    try:
+        return (int(high, 16) << 32) | int(low, 16) if separator else None
+    except ValueError:
+        return None
+
+
+def read_urls():
+    return [url.strip() for url in (os.environ.get('DATABASE_READ_URL') or '').split(',') if url.strip()]
+
+
+def _replica_caught_up(conn, dsn: str, min_lsn: Optional[int]) -> bool:
+    if min_lsn is None or _replica_lsn.get(dsn, -1) >= min_lsn:
+        return True
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT pg_last_wal_replay_lsn()::text')
+        replayed = cursor.fetchone()[0]
+    conn.rollback()
+    if replayed is None:
+        # Не реплика (например, DATABASE_READ_URL указывает на основную БД) - она всегда актуальна
+        return True
+    _replica_lsn[dsn] = max(_replica_lsn.get(dsn, -1), parse_lsn(replayed))
+    return _replica_lsn[dsn] >= min_lsn
+
+
+def _connect_replica(min_lsn: Optional[int], wait: bool):
+    global _replica_turn
+
+    urls = read_urls()
+    if os.environ.get('DB_READ_POLICY') == 'random':
+        random.shuffle(urls)
+    else:
+        _replica_turn += 1
+        shift = _replica_turn % len(urls)
+        urls = urls[shift:] + urls[:shift]
+
+    for dsn in urls:
+        if _replica_down_until.get(dsn, 0) > time.monotonic():
+            continue
+        try:
+            conn = _open(dsn, wait)
+        except Exception as error:
+            print(f'Read replica unavailable, skipping for {REPLICA_RETRY_SECONDS}s: {error}')
+            _replica_down_until[dsn] = time.monotonic() + REPLICA_RETRY_SECONDS
+            continue
+        if conn is None:
+            continue
+        try:
+            if _replica_caught_up(conn, dsn, min_lsn):
+                return conn
+        except Exception as error:
+            print(f'Read replica check failed: {error}')
+        conn.close()
+    # Ни одна реплика не догнала запись клиента - читаем с основной БД
+    return None
+
+
+def connect(readonly: Optional[bool] = None, wait: bool = True):
+    '''
+    Business: Открывает соединение с БД: запись - с основной, чтение запроса - с реплики, если она есть
+    Args: readonly - явно выбрать реплику/основную БД, по умолчанию берётся из bind_request;
+          wait=False - не ждать свободного места в пуле
+    Returns: соединение psycopg2 (из пула при DB_POOL_SIZE > 0) или None, если пул занят и wait=False;
+             сам драйвер импортируется при первом вызове
+    '''
+    request_readonly, min_lsn = _request.get()
+    if readonly is None:
+        readonly = request_readonly
+
+    if readonly and read_urls():
+        conn = _connect_replica(min_lsn, wait)
+        if conn is not None:
+            return conn
+    return _open(os.environ.get('DATABASE_URL'), wait)
+
+
+def bind_request(event: Dict[str, Any]) -> None:
+    '''
+    Business: Запоминает для текущего запроса, можно ли читать с реплики и какой LSN она должна догнать
+    Args: event - GET-запросы идут на реплики, заголовок X-Consistency-Token задаёт минимальный LSN
+    Returns: None
+    '''
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    _request.set((
+        event.get('httpMethod', 'GET') == 'GET',
+        parse_lsn(headers.get(CONSISTENCY_HEADER.lower()))
+    ))
+
+
+def attach_consistency_token(event: Dict[str, Any], response: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Добавляет к ответу на успешную запись LSN основной БД для чтения своих записей
+    Args: event - запрос, response - ответ маршрута
+    Returns: тот же response; заголовок добавляется только при настроенных репликах
+    '''
+    if not read_urls() or event.get('httpMethod', 'GET') == 'GET' or response.get('statusCode', 500) >= 400:
+        return response
+    if response.get('statusCode') == 204:
+        # Ответ без тела (например, учёт прослушивания) нечего перечитывать
+        return response
+
+    conn = connect(readonly=False)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_current_wal_lsn()::text')
+            lsn = cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+    headers = dict(response.get('headers') or {})
+    headers[CONSISTENCY_HEADER] = lsn
+    exposed = headers.get('Access-Control-Expose-Headers')
+    headers['Access-Control-Expose-Headers'] = f'{exposed}, {CONSISTENCY_HEADER}' if exposed else CONSISTENCY_HEADER
+    return dict(response, headers=headers)
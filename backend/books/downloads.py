@@ -0,0 +1,161 @@
+import base64
+import json
+from typing import Dict, Any
+
+from byte_ranges import MAX_CHUNK_BYTES, parse_range
+from db import connect, SCHEMA_NAME
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'epub': 'application/epub+zip',
+    'fb2': 'application/x-fictionbook+xml',
+    'mobi': 'application/x-mobipocket-ebook',
+    'mp3': 'audio/mpeg',
+    'm4b': 'audio/mp4',
+    'txt': 'text/plain; charset=utf-8'
+}
+# Покупки, дающие право скачать файл; покупка read открывает только чтение на сайте
+DOWNLOAD_PURCHASE_TYPES = ['download', 'cart']
+# Заголовок data:-адреса ("data:application/epub+zip;base64,") короче; хвост нужен для padding и ETag
+DATA_URL_HEAD_CHARS = 256
+DATA_URL_TAIL_CHARS = 64
+
+
+def download(event: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Скачивание файла книги только после проверки покупки, с поддержкой Range/If-Range
+    Args: event с заголовками X-User-Email, Range, If-Range; params с bookId, format (userEmail для ссылок)
+    Returns: HTTP response 200/206 с частью файла, 403 без покупки, 404 без файла, 416 для неверного Range
+    '''
+    headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+    user_email = headers.get('x-user-email') or params.get('userEmail')
+    book_id = params.get('bookId')
+    file_format = params.get('format')
+
+    if not book_id or not str(book_id).isdigit() or not file_format:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'bookId and format required'}),
+            'isBase64Encoded': False
+        }
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    try:
+        # Одна выборка: файл формата, цена и наличие покупки по индексу (user_email, book_id).
+        # Из data:-адреса читаются только заголовок, длина и хвост - сам файл читается частями при отдаче
+        cursor.execute(f'''
+            SELECT CASE WHEN f.file_url LIKE 'data:%%' THEN substring(f.file_url from 1 for %s) ELSE f.file_url END,
+                   b.price,
+                   EXISTS (
+                       SELECT 1 FROM {SCHEMA_NAME}.purchases p
+                       WHERE p.user_email = %s AND p.book_id = b.id AND p.purchase_type = ANY(%s)
+                   ),
+                   f.id, octet_length(f.file_url), right(f.file_url, %s)
+            FROM {SCHEMA_NAME}.book_formats f
+            JOIN {SCHEMA_NAME}.books b ON b.id = f.book_id
+            WHERE f.book_id = %s AND f.format = %s
+            LIMIT 1
+        ''', (DATA_URL_HEAD_CHARS, user_email or '', DOWNLOAD_PURCHASE_TYPES, DATA_URL_TAIL_CHARS,
+              int(book_id), file_format))
+        row = cursor.fetchone()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not row or not row[0]:
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'File not found'}),
+            'isBase64Encoded': False
+        }
+
+    file_url, price, is_purchased, format_id, url_length, tail = row
+
+    if float(price) > 0 and not is_purchased:
+        return {
+            'statusCode': 403,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Book not purchased'}),
+            'isBase64Encoded': False
+        }
+
+    if file_url.startswith(('http://', 'https://')):
+        return {
+            'statusCode': 302,
+            'headers': {'Location': file_url, 'Access-Control-Allow-Origin': '*'},
+            'body': '',
+            'isBase64Encoded': False
+        }
+
+    import file_store
+
+    try:
+        if file_url.startswith('data:'):
+            stored_file = file_store.open_data_url(format_id, file_url, url_length, tail)
+        else:
+            stored_file = file_store.open_stored_file(file_url)
+    except file_store.FileStoreError:
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'File not found'}),
+            'isBase64Encoded': False
+        }
+
+    response_headers = {
+        'Content-Type': CONTENT_TYPES.get(file_format.lower(), 'application/octet-stream'),
+        'Content-Disposition': f'attachment; filename="book-{book_id}.{file_format}"',
+        'Accept-Ranges': 'bytes',
+        'ETag': stored_file.etag,
+        'Cache-Control': 'private, no-transform',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'Content-Range, Accept-Ranges, ETag'
+    }
+    if stored_file.last_modified:
+        response_headers['Last-Modified'] = stored_file.last_modified
+
+    range_header = headers.get('range')
+    if_range = headers.get('if-range')
+    # If-Range: диапазон действует только для той же версии файла, иначе отдаём файл с начала
+    if if_range and if_range not in (stored_file.etag, stored_file.last_modified):
+        range_header = None
+
+    try:
+        requested = parse_range(range_header, stored_file.size)
+    except ValueError:
+        response_headers['Content-Range'] = f'bytes */{stored_file.size}'
+        return {
+            'statusCode': 416,
+            'headers': response_headers,
+            'body': '',
+            'isBase64Encoded': False
+        }
+
+    start, end = requested if requested else (0, stored_file.size - 1)
+    end = min(end, start + MAX_CHUNK_BYTES - 1)
+    try:
+        chunk = stored_file.read(start, end - start + 1) if stored_file.size else b''
+    except file_store.FileStoreError:
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'File not found'}),
+            'isBase64Encoded': False
+        }
+
+    # Файл больше одной части отдаётся как 206 даже без Range - клиент дочитывает остаток
+    is_partial = requested is not None or len(chunk) < stored_file.size
+    if is_partial:
+        response_headers['Content-Range'] = f'bytes {start}-{start + len(chunk) - 1}/{stored_file.size}'
+
+    return {
+        'statusCode': 206 if is_partial else 200,
+        'headers': response_headers,
+        'body': base64.b64encode(chunk).decode('ascii'),
+        'isBase64Encoded': True
+    }
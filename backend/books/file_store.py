@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from email.utils import formatdate
+from typing import Optional
+
+BOOK_STORE_DIR = os.environ.get('BOOK_STORE_DIR', '/tmp/book-store')
+
+
+class FileStoreError(Exception):
+    pass
+
+
+class StoredFile(ABC):
+    '''
+    Business: Файл книги в хранилище с чтением произвольного диапазона байт
+    Args: size, etag, last_modified (HTTP-дата) - метаданные для Range/If-Range
+    Returns: объект, отдающий только запрошенный диапазон, не загружая файл целиком
+    '''
+
+    def __init__(self, size: int, etag: str, last_modified: Optional[str]):
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @abstractmethod
+    def read(self, start: int, length: int) -> bytes:
+        '''Читает length байт начиная со start'''
+
+
+class LocalStoredFile(StoredFile):
+    def __init__(self, path: str):
+        stat = os.stat(path)
+        super().__init__(
+            size=stat.st_size,
+            etag=f'"{stat.st_size:x}-{int(stat.st_mtime):x}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True)
+        )
+        self.path = path
+
+    def read(self, start: int, length: int) -> bytes:
+        with open(self.path, 'rb') as stored_file:
+            stored_file.seek(start)
+            return stored_file.read(length)
+
+
+class DataUrlStoredFile(StoredFile):
+    '''
+    Business: Файл, загруженный из админки data:-адресом в book_formats.file_url
+    Args: format_id - id строки book_formats, header_length - длина "data:...;base64,",
+          url_length - длина file_url, tail - последние символы file_url
+    Returns: файл, который читает из БД и декодирует только окно base64, покрывающее диапазон
+    '''
+
+    def __init__(self, format_id: int, header_length: int, url_length: int, tail: str):
+        payload_length = url_length - header_length
+        if payload_length % 4:
+            raise FileStoreError('Invalid base64 payload length')
+        padding = len(tail[-2:]) - len(tail[-2:].rstrip('='))
+        super().__init__(
+            size=payload_length // 4 * 3 - padding,
+            etag=f'"{format_id:x}-{url_length:x}-{hashlib.md5(tail.encode()).hexdigest()[:12]}"',
+            last_modified=None
+        )
+        self.format_id = format_id
+        self.header_length = header_length
+
+    def read(self, start: int, length: int) -> bytes:
+        from db import connect, SCHEMA_NAME
+
+        # Каждые 4 символа base64 - это 3 байта: берём целые четвёрки, покрывающие диапазон
+        first_quad = start // 3
+        last_quad = (start + length - 1) // 3
+        conn = connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'''
+                SELECT substring(file_url from %s for %s) FROM {SCHEMA_NAME}.book_formats WHERE id = %s
+            ''', (self.header_length + first_quad * 4 + 1, (last_quad - first_quad + 1) * 4, self.format_id))
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if not row:
+            raise FileStoreError(f'File {self.format_id} was removed')
+        skip = start - first_quad * 3
+        return base64.b64decode(row[0])[skip:skip + length]
+
+
+class LocalFileStore:
+    '''
+    Business: Локальное файловое хранилище книг (замена объектного хранилища)
+    Args: root - корневой каталог, по умолчанию BOOK_STORE_DIR
+    Returns: хранилище, открывающее файлы по относительному пути или file://-адресу
+    '''
+
+    def __init__(self, root: str = BOOK_STORE_DIR):
+        self.root = os.path.realpath(root)
+
+    def open(self, file_url: str) -> StoredFile:
+        relative = file_url[len('file://'):] if file_url.startswith('file://') else file_url
+        path = os.path.realpath(os.path.join(self.root, relative.lstrip('/')))
+        if os.path.commonpath([self.root, path]) != self.root or not os.path.isfile(path):
+            raise FileStoreError(f'File not found: {file_url}')
+        return LocalStoredFile(path)
+
+
+def open_stored_file(file_url: str, store: Optional[LocalFileStore] = None) -> StoredFile:
+    '''
+    Business: Открывает файл формата книги из хранилища
+    Args: file_url - путь в хранилище или file://-адрес, store - хранилище
+    Returns: StoredFile; FileStoreError, если файл не найден
+    '''
+    return (store or LocalFileStore()).open(file_url)
+
+
+def open_data_url(format_id: int, head: str, url_length: int, tail: str) -> DataUrlStoredFile:
+    '''
+    Business: Открывает data:-файл по его началу и длине, не загружая сам base64
+    Args: format_id - id строки book_formats, head - начало file_url с заголовком,
+          url_length - длина file_url, tail - последние символы file_url
+    Returns: DataUrlStoredFile; FileStoreError для не-base64 или повреждённого адреса
+    '''
+    header, separator, _ = head.partition(',')
+    if not separator or not header.endswith(';base64'):
+        raise FileStoreError('Only base64 data URLs are supported')
+    return DataUrlStoredFile(format_id, len(header) + 1, url_length, tail)
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from db import connect
+
+MAX_PARALLEL_QUERIES = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_QUERIES, thread_name_prefix='db-query')
+        return _executor
+
+
+def _timed_fetch(cursor, sql: str, params: Tuple) -> Tuple[List[Tuple], float]:
+    started = time.perf_counter()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return rows, (time.perf_counter() - started) * 1000
+
+
+def _fetch_on_pooled_connection(conn, sql: str, params: Tuple) -> Tuple[List[Tuple], float]:
+    cursor = conn.cursor()
+    try:
+        return _timed_fetch(cursor, sql, params)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def run_queries(cursor, queries: Dict[str, Tuple[str, Tuple]]) -> Tuple[Dict[str, List[Tuple]], Dict[str, float]]:
+    '''
+    Business: Выполняет независимые SELECT-запросы маршрута параллельно на отдельных соединениях пула
+    Args: cursor - курсор маршрута, queries - {имя: (sql, параметры)} в порядке важности
+    Returns: ({имя: строки}, {имя: время в мс}); без пула (DB_POOL_SIZE) или без свободных
+             соединений в нём запросы идут по очереди на cursor
+    '''
+    results: Dict[str, List[Tuple]] = {}
+    timings: Dict[str, float] = {}
+    names = list(queries)
+
+    if int(os.environ.get('DB_POOL_SIZE') or 0) <= 0 or len(names) < 2:
+        # Новое соединение на каждый запрос дороже, чем сами короткие запросы
+        for name in names:
+            results[name], timings[name] = _timed_fetch(cursor, *queries[name])
+        return results, timings
+
+    # Маршрут уже держит одно соединение пула: ожидание следующих заблокировало бы его навсегда,
+    # если пул занят такими же маршрутами, поэтому берутся только свободные соединения.
+    # Первый запрос и те, кому соединения не хватило, выполняются на соединении маршрута
+    futures = {}
+    for name in names[1:]:
+        conn = connect(wait=False)
+        if conn is None:
+            break
+        futures[name] = get_executor().submit(_fetch_on_pooled_connection, conn, *queries[name])
+    for name in names:
+        if name not in futures:
+            results[name], timings[name] = _timed_fetch(cursor, *queries[name])
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    return {name: results[name] for name in names}, {name: timings[name] for name in names}
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    '''
+    Business: Форматирует время запросов для заголовка Server-Timing
+    Args: timings - {имя: мс}
+    Returns: значение заголовка, например "db-books;dur=1.2, db-formats;dur=0.8"
+    '''
+    return ', '.join(f'db-{name};dur={elapsed_ms:.1f}' for name, elapsed_ms in timings.items())
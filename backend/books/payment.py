@@ -0,0 +1,70 @@
+import json
+import os
+from typing import Dict, Any
+
+
+def yoomoney_form(event: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Формирование параметров платёжной формы ЮMoney для книги или корзины
+    Args: event с заголовками Origin/Referer, params с bookId, userEmail, amount, purchaseType
+    Returns: HTTP response с данными для формы оплаты или ошибкой
+    '''
+    wallet_id = os.environ.get('YOOMONEY_WALLET_ID')
+    
+    book_id = params.get('bookId')
+    user_email = params.get('userEmail')
+    purchase_type = params.get('purchaseType', 'download')
+    amount = params.get('amount')
+    
+    print(f'YooMoney form request: bookId={book_id}, userEmail={user_email}, amount={amount}, wallet_id={wallet_id}')
+    
+    if not wallet_id:
+        error_msg = 'YOOMONEY_WALLET_ID не установлен. Добавьте секрет в настройках проекта.'
+        print(f'ERROR: {error_msg}')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': error_msg}),
+            'isBase64Encoded': False
+        }
+    
+    if not all([book_id, user_email, amount]):
+        error_msg = f'Отсутствуют параметры: bookId={book_id}, userEmail={user_email}, amount={amount}'
+        print(f'ERROR: {error_msg}')
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': error_msg}),
+            'isBase64Encoded': False
+        }
+    
+    label = params.get('label', f"{user_email}_{book_id}_{purchase_type}")
+    
+    headers = event.get('headers', {})
+    origin = headers.get('origin') or headers.get('Origin') or headers.get('referer') or headers.get('Referer') or 'https://preview--litres-site-creation.poehali.dev'
+    base_url = origin.rstrip('/')
+    
+    if purchase_type == 'cart' or ',' in book_id:
+        success_url = f'{base_url}/my-books'
+        targets = f'Оплата заказа'
+    else:
+        success_url = f'{base_url}/payment-success?bookId={book_id}'
+        targets = f'Оплата книги #{book_id}'
+    
+    payment_data = {
+        'receiver': wallet_id,
+        'quickpay_form': 'shop',
+        'targets': targets,
+        'paymentType': 'AC',
+        'sum': amount,
+        'label': label,
+        'successURL': success_url,
+        'formUrl': 'https://yoomoney.ru/quickpay/confirm'
+    }
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps(payment_data),
+        'isBase64Encoded': False
+    }
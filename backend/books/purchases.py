@@ -0,0 +1,128 @@
+import json
+from typing import Dict, Any
+
+from db import connect, SCHEMA_NAME
+
+
+def list_purchases(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: История покупок пользователя
+    Args: event с заголовком X-User-Email
+    Returns: HTTP response со списком покупок и данными книг
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        headers = event.get('headers', {})
+        user_email = headers.get('x-user-email') or headers.get('X-User-Email')
+        
+        if not user_email:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'User email required'}),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(f'''
+            SELECT p.id, p.book_id, p.purchase_type, p.price, p.purchased_at,
+                   b.title, b.author, b.cover, b.genre
+            FROM {SCHEMA_NAME}.purchases p
+            JOIN {SCHEMA_NAME}.books b ON p.book_id = b.id
+            WHERE p.user_email = %s
+            ORDER BY p.purchased_at DESC
+        ''', (user_email,))
+        
+        purchases = []
+        for row in cursor.fetchall():
+            purchases.append({
+                'id': row[0],
+                'bookId': row[1],
+                'purchaseType': row[2],
+                'price': float(row[3]),
+                'purchasedAt': row[4].isoformat(),
+                'book': {
+                    'title': row[5],
+                    'author': row[6],
+                    'cover': row[7],
+                    'genre': row[8]
+                }
+            })
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'purchases': purchases}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def create_purchase(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Оформление покупки книги пользователем
+    Args: event с заголовком X-User-Email, body с bookId, purchaseType, price
+    Returns: HTTP response с id созданной покупки или ошибкой
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        body_data = json.loads(event.get('body', '{}'))
+        headers = event.get('headers', {})
+        user_email = headers.get('x-user-email') or headers.get('X-User-Email')
+        
+        if not user_email:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'User email required'}),
+                'isBase64Encoded': False
+            }
+        
+        book_id = body_data.get('bookId')
+        purchase_type = body_data.get('purchaseType', 'download')
+        price = body_data.get('price', 0)
+        
+        cursor.execute(f'''
+            SELECT id FROM {SCHEMA_NAME}.purchases 
+            WHERE user_email = %s AND book_id = %s AND purchase_type = %s
+        ''', (user_email, book_id, purchase_type))
+        
+        if cursor.fetchone():
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Already purchased'}),
+                'isBase64Encoded': False
+            }
+        
+        cursor.execute(f'''
+            INSERT INTO {SCHEMA_NAME}.purchases (user_email, book_id, purchase_type, price)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id
+        ''', (user_email, book_id, purchase_type, price))
+        
+        purchase_id = cursor.fetchone()[0]
+        
+        import book_popularity
+        book_popularity.record_sale(cursor, book_id)
+        conn.commit()
+        
+        import recommendations
+        recommendations.record_purchase(cursor, user_email, book_id)
+        
+        return {
+            'statusCode': 201,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'id': purchase_id, 'message': 'Purchase created'}),
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,176 @@
+import base64
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List
+
+import rate_limit
+from db import connect, SCHEMA_NAME
+
+EXPORT_ITERSIZE = 5000
+# Выгрузка за месяц в десятки раз больше лимита тела ответа, поэтому идёт частями с X-Next-Cursor;
+# часть ограничена по объёму, а не по числу строк, и память не растёт с диапазоном дат
+EXPORT_CHUNK_BYTES = 3 * 1024 * 1024
+TEXT_FLUSH_BYTES = 64 * 1024
+EXPORT_COLUMNS = ['id', 'purchasedAt', 'userEmail', 'bookId', 'title', 'author', 'purchaseType', 'price']
+
+
+class ChunkWriter:
+    '''
+    Business: Пишет строки выгрузки в буфер, при gzip сжимая их по мере записи
+    Args: export_format - csv или ndjson, compress - сжимать ли gzip
+    Returns: писатель, знающий текущий размер части в байтах UTF-8
+    '''
+
+    def __init__(self, export_format: str, compress: bool):
+        self.export_format = export_format
+        self.output = io.BytesIO()
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        # Строки копятся уже в UTF-8: кириллица занимает два байта, и размер части считается в байтах
+        self.pending = bytearray()
+        self.line = io.StringIO()
+        self.csv_writer = csv.writer(self.line)
+
+    def write_header(self) -> None:
+        if self.export_format == 'csv':
+            self.csv_writer.writerow(EXPORT_COLUMNS)
+            self._take_line()
+            self._flush_pending()
+
+    def write_row(self, row: tuple) -> None:
+        values = [row[0], row[1].isoformat(), row[2], row[3], row[4], row[5], row[6], float(row[7])]
+        if self.export_format == 'csv':
+            self.csv_writer.writerow(values)
+        else:
+            self.line.write(json.dumps(dict(zip(EXPORT_COLUMNS, values)), ensure_ascii=False))
+            self.line.write('\n')
+        self._take_line()
+        if len(self.pending) >= TEXT_FLUSH_BYTES:
+            self._flush_pending()
+
+    def _take_line(self) -> None:
+        self.pending += self.line.getvalue().encode('utf-8')
+        self.line.seek(0)
+        self.line.truncate()
+
+    def _flush_pending(self) -> None:
+        data = bytes(self.pending)
+        self.pending.clear()
+        self.output.write(self.compressor.compress(data) if self.compressor else data)
+
+    @property
+    def size(self) -> int:
+        return self.output.tell() + len(self.pending)
+
+    def finish(self) -> bytes:
+        self._flush_pending()
+        if self.compressor:
+            self.output.write(self.compressor.flush())
+        return self.output.getvalue()
+
+
+def export_purchases(event: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Выгрузка всех покупок за период с названием и автором книги для бухгалтерии (только админ)
+    Args: event с заголовком X-User-Id; params с from, to (даты включительно), format (csv/ndjson), gzip, cursor
+    Returns: HTTP response с частью выгрузки и X-Next-Cursor, пока строки не закончились
+    '''
+    headers = event.get('headers') or {}
+    user_id = headers.get('x-user-id') or headers.get('X-User-Id')
+
+    if user_id != '1':
+        return {
+            'statusCode': 403,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Admin access required'}),
+            'isBase64Encoded': False
+        }
+
+    export_format = params.get('format', 'csv')
+    compress = params.get('gzip') == 'true'
+    # Курсор подписан (X-Next-Cursor); подпись проверяет ограничитель в index.py
+    cursor_token, _ = rate_limit.split_cursor('purchases-export', params.get('cursor'))
+
+    try:
+        if export_format not in ('csv', 'ndjson'):
+            raise ValueError('Unsupported export format')
+        date_from = date.fromisoformat(params['from'])
+        date_to = date.fromisoformat(params['to'])
+        if date_from > date_to:
+            raise ValueError('from must not be after to')
+        if date_to == date.max:
+            raise ValueError('to is out of range')
+        conditions = ['p.purchased_at >= %s', 'p.purchased_at < %s']
+        query_params: List[Any] = [date_from, date_to + timedelta(days=1)]
+        if cursor_token:
+            cursor_purchased_at, cursor_id = cursor_token.rsplit('|', 1)
+            conditions.append('(p.purchased_at, p.id) > (%s, %s)')
+            query_params.extend([datetime.fromisoformat(cursor_purchased_at), int(cursor_id)])
+    except (KeyError, ValueError) as error:
+        message = 'from and to dates required (YYYY-MM-DD)' if isinstance(error, KeyError) else str(error)
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': message}),
+            'isBase64Encoded': False
+        }
+
+    conn = connect()
+
+    try:
+        # Серверный курсор отдаёт строки пачками по EXPORT_ITERSIZE, а не всю выборку сразу;
+        # LEFT JOIN сохраняет продажи удалённых книг
+        export_cursor = conn.cursor(name='purchases_export')
+        export_cursor.itersize = EXPORT_ITERSIZE
+        export_cursor.execute(f'''
+            SELECT p.id, p.purchased_at, p.user_email, p.book_id, b.title, b.author, p.purchase_type, p.price
+            FROM {SCHEMA_NAME}.purchases p
+            LEFT JOIN {SCHEMA_NAME}.books b ON b.id = p.book_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY p.purchased_at, p.id
+        ''', query_params)
+
+        writer = ChunkWriter(export_format, compress)
+        if not cursor_token:
+            writer.write_header()
+
+        # base64 для gzip-ответа увеличивает тело на треть; запас в TEXT_FLUSH_BYTES покрывает
+        # последнюю строку и данные, которые gzip ещё держит внутри компрессора
+        chunk_bytes = (EXPORT_CHUNK_BYTES * 3 // 4 if compress else EXPORT_CHUNK_BYTES) - TEXT_FLUSH_BYTES
+        last_row = None
+        has_more = False
+        for row in export_cursor:
+            if writer.size >= chunk_bytes:
+                has_more = True
+                break
+            writer.write_row(row)
+            last_row = row
+        export_cursor.close()
+        body = writer.finish()
+
+    finally:
+        conn.close()
+
+    filename = f'purchases-{date_from.isoformat()}-{date_to.isoformat()}.{export_format}'
+    response_headers = {
+        'Content-Type': 'text/csv; charset=utf-8' if export_format == 'csv' else 'application/x-ndjson',
+        'Content-Disposition': f'attachment; filename="{filename}{".gz" if compress else ""}"',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'X-Next-Cursor'
+    }
+    if compress:
+        # Каждая часть - отдельный gzip-член: склеенные части тоже корректный .gz-файл
+        response_headers['Content-Type'] = 'application/gzip'
+    if has_more:
+        response_headers['X-Next-Cursor'] = rate_limit.sign_cursor(
+            'purchases-export', f'{last_row[1].isoformat()}|{last_row[0]}'
+        )
+
+    return {
+        'statusCode': 200,
+        'headers': response_headers,
+        'body': base64.b64encode(body).decode('ascii') if compress else body.decode('utf-8'),
+        'isBase64Encoded': compress
+    }
@@ -0,0 +1,311 @@
+import json
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from db import connect, SCHEMA_NAME
+
+TOP_N = 20
+LIMIT_DEFAULT = 10
+REBUILD_INTERVAL_SECONDS = 6 * 60 * 60
+LOAD_BATCH_SIZE = 50000
+# Покупатели с огромной корзиной дают квадратичное число пар и почти не несут сигнала
+MAX_BASKET_SIZE = 500
+PAIR_CHUNK_SIZE = 5_000_000
+
+_index: Optional['RecommendationIndex'] = None
+_lock = threading.Lock()
+
+
+class RecommendationIndex:
+    '''
+    Business: Разреженная матрица совместных покупок книг и готовые top-N соседей
+    Args: book_ids - id книг по внутренним индексам, buyers - число покупателей книги,
+          indptr/indices/counts - полная матрица совместных покупок в формате CSR,
+          top_indptr/top_indices/top_scores - top-N похожих книг в формате CSR
+    Returns: индекс с поиском похожих книг за O(N) и инкрементальным обновлением
+    '''
+
+    def __init__(self, book_ids, buyers, indptr, indices, counts, top_indptr, top_indices, top_scores):
+        self.book_ids = book_ids
+        self.buyers = buyers
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.top_indptr = top_indptr
+        self.top_indices = top_indices
+        self.top_scores = top_scores
+        self.positions: Dict[int, int] = {int(book_id): i for i, book_id in enumerate(book_ids.tolist())}
+        self.built_at = time.time()
+        # Продажи после сборки: доп. покупатели, доп. пары и пересчитанные строки top-N
+        self.extra_buyers: Dict[int, int] = {}
+        self.extra_counts: Dict[int, Dict[int, int]] = {}
+        self.overrides: Dict[int, List[Tuple[int, float]]] = {}
+
+    def similar(self, book_id: int, limit: int) -> List[Tuple[int, float]]:
+        if book_id in self.overrides:
+            return self.overrides[book_id][:limit]
+
+        position = self.positions.get(book_id)
+        if position is None:
+            return []
+
+        start = self.top_indptr[position]
+        end = min(self.top_indptr[position + 1], start + limit)
+        return list(zip(self.book_ids[self.top_indices[start:end]].tolist(), self.top_scores[start:end].tolist()))
+
+    def add_purchase(self, book_id: int, other_book_ids: List[int]) -> None:
+        self.extra_buyers[book_id] = self.extra_buyers.get(book_id, 0) + 1
+        for other_id in other_book_ids:
+            row = self.extra_counts.setdefault(book_id, {})
+            row[other_id] = row.get(other_id, 0) + 1
+            row = self.extra_counts.setdefault(other_id, {})
+            row[book_id] = row.get(book_id, 0) + 1
+
+        # Сходство остальных пар с этой книгой слегка устаревает до следующей полной сборки
+        for changed_id in [book_id] + other_book_ids:
+            self.overrides[changed_id] = self._rank_row(changed_id)
+
+    def _buyers_of(self, book_id: int) -> int:
+        position = self.positions.get(book_id)
+        base = int(self.buyers[position]) if position is not None else 0
+        return base + self.extra_buyers.get(book_id, 0)
+
+    def _rank_row(self, book_id: int) -> List[Tuple[int, float]]:
+        counts: Dict[int, int] = {}
+        position = self.positions.get(book_id)
+        if position is not None:
+            start, end = self.indptr[position], self.indptr[position + 1]
+            counts = dict(zip(self.book_ids[self.indices[start:end]].tolist(), self.counts[start:end].tolist()))
+        for other_id, extra in self.extra_counts.get(book_id, {}).items():
+            counts[other_id] = counts.get(other_id, 0) + extra
+
+        buyers = self._buyers_of(book_id)
+        scored = [
+            (other_id, count / ((buyers * self._buyers_of(other_id)) ** 0.5))
+            for other_id, count in counts.items()
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:TOP_N]
+
+
+def _load_pairs(conn):
+    '''
+    Business: Читает уникальные пары (покупатель, книга) серверным курсором пачками
+    Args: conn - соединение с БД
+    Returns: numpy-массивы кодов покупателей и id книг, упорядоченные по покупателю
+    '''
+    import numpy as np
+
+    user_chunks = []
+    book_chunks = []
+    last_email = None
+    user_code = -1
+
+    cursor = conn.cursor(name='recommendations_pairs')
+    cursor.itersize = LOAD_BATCH_SIZE
+    cursor.execute(f'''
+        SELECT DISTINCT user_email, book_id
+        FROM {SCHEMA_NAME}.purchases
+        ORDER BY user_email
+    ''')
+
+    try:
+        while True:
+            rows = cursor.fetchmany(LOAD_BATCH_SIZE)
+            if not rows:
+                break
+            codes = np.empty(len(rows), dtype=np.int64)
+            for i, (email, _) in enumerate(rows):
+                if email != last_email:
+                    last_email = email
+                    user_code += 1
+                codes[i] = user_code
+            user_chunks.append(codes)
+            book_chunks.append(np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows)))
+    finally:
+        cursor.close()
+
+    if not user_chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(user_chunks), np.concatenate(book_chunks)
+
+
+def _cooccurrence(users, items, n_items: int):
+    '''
+    Business: Векторно считает совместные покупки для всех упорядоченных пар книг
+    Args: users - коды покупателей (отсортированы), items - внутренние индексы книг, n_items - число книг
+    Returns: отсортированные ключи пар (i * n_items + j) и счётчики совместных покупок
+    '''
+    import numpy as np
+
+    group_starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(users)])
+    keep = group_sizes <= MAX_BASKET_SIZE
+    group_starts, group_sizes = group_starts[keep & (group_sizes > 1)], group_sizes[keep & (group_sizes > 1)]
+
+    keys_parts = []
+    counts_parts = []
+    pair_totals = np.cumsum(group_sizes.astype(np.int64) ** 2)
+    chunk_start = 0
+    while chunk_start < len(group_starts):
+        offset = pair_totals[chunk_start - 1] if chunk_start else 0
+        chunk_end = max(int(np.searchsorted(pair_totals, offset + PAIR_CHUNK_SIZE, side='right')), chunk_start + 1)
+        starts, sizes = group_starts[chunk_start:chunk_end], group_sizes[chunk_start:chunk_end]
+
+        # Каждая строка корзины размера k повторяется k раз и сочетается со всеми строками корзины
+        row_sizes = np.repeat(sizes, sizes)
+        row_starts = np.repeat(starts, sizes)
+        rows = row_starts + np.arange(len(row_sizes)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        left = np.repeat(rows, row_sizes)
+        block_offsets = np.repeat(np.cumsum(row_sizes) - row_sizes, row_sizes)
+        right = np.repeat(row_starts, row_sizes) + np.arange(len(left)) - block_offsets
+
+        mask = left != right
+        keys, counts = np.unique(items[left[mask]] * n_items + items[right[mask]], return_counts=True)
+        keys_parts.append(keys)
+        counts_parts.append(counts)
+        chunk_start = chunk_end
+
+    if not keys_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    keys = np.concatenate(keys_parts)
+    counts = np.concatenate(counts_parts)
+    order = np.argsort(keys, kind='stable')
+    keys, counts = keys[order], counts[order]
+    unique_keys, first = np.unique(keys, return_index=True)
+    return unique_keys, np.add.reduceat(counts, first)
+
+
+def build_index(conn) -> RecommendationIndex:
+    '''
+    Business: Полная пересборка индекса рекомендаций по таблице purchases
+    Args: conn - соединение с БД
+    Returns: новый RecommendationIndex
+    '''
+    import numpy as np
+
+    users, books = _load_pairs(conn)
+    book_ids, items = np.unique(books, return_inverse=True)
+    n_items = len(book_ids)
+    buyers = np.bincount(items, minlength=n_items).astype(np.int32)
+
+    keys, counts = _cooccurrence(users, items, n_items)
+    rows = keys // max(n_items, 1)
+    cols = (keys % max(n_items, 1)).astype(np.int32)
+    indptr = np.searchsorted(rows, np.arange(n_items + 1))
+
+    # Косинусная мера: совместные покупки / sqrt(покупатели_i * покупатели_j)
+    scores = counts / np.sqrt(buyers[rows].astype(np.float64) * buyers[cols])
+    order = np.lexsort((-scores, rows))
+    ranks = np.arange(len(order)) - indptr[rows[order]]
+    top = order[ranks < TOP_N]
+    top_indptr = np.searchsorted(rows[top], np.arange(n_items + 1))
+
+    return RecommendationIndex(
+        book_ids=book_ids,
+        buyers=buyers,
+        indptr=indptr,
+        indices=cols,
+        counts=counts.astype(np.int32),
+        top_indptr=top_indptr,
+        top_indices=cols[top],
+        top_scores=scores[top].astype(np.float32)
+    )
+
+
+def get_index(force_rebuild: bool = False) -> RecommendationIndex:
+    global _index
+
+    with _lock:
+        if force_rebuild or _index is None or time.time() - _index.built_at > REBUILD_INTERVAL_SECONDS:
+            conn = connect()
+            try:
+                _index = build_index(conn)
+            finally:
+                conn.close()
+        return _index
+
+
+def record_purchase(cursor, user_email: str, book_id: int) -> None:
+    '''
+    Business: Инкрементально учитывает новую продажу в индексе этого экземпляра функции
+    Args: cursor - курсор транзакции, в которой покупка уже записана, user_email, book_id
+    Returns: None; если индекс ещё не собран, ничего не делает - он соберётся при первом запросе
+    '''
+    if _index is None:
+        return
+
+    book_id = int(book_id)
+    cursor.execute(f'''
+        SELECT book_id, COUNT(*) FROM {SCHEMA_NAME}.purchases
+        WHERE user_email = %s
+        GROUP BY book_id
+    ''', (user_email,))
+    owned = dict(cursor.fetchall())
+
+    # Повторная покупка той же книги в другом формате не добавляет нового покупателя
+    if owned.get(book_id, 0) > 1 or len(owned) > MAX_BASKET_SIZE:
+        return
+
+    with _lock:
+        _index.add_purchase(book_id, [other_id for other_id in owned if other_id != book_id])
+
+
+def handle(event: Dict[str, Any], method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: API рекомендаций "С этой книгой покупают" и пересборка индекса
+    Args: event, method (GET - рекомендации, POST - пересборка администратором), params с bookId и limit
+    Returns: HTTP response со списком похожих книг и их оценкой
+    '''
+    if method == 'POST':
+        headers = event.get('headers', {})
+        user_id = headers.get('x-user-id') or headers.get('X-User-Id')
+
+        if user_id != '1':
+            return {
+                'statusCode': 403,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Только администратор может пересобирать рекомендации'}),
+                'isBase64Encoded': False
+            }
+
+        index = get_index(force_rebuild=True)
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'booksCount': len(index.book_ids), 'pairsCount': len(index.indices)}),
+            'isBase64Encoded': False
+        }
+
+    if method != 'GET':
+        return {
+            'statusCode': 405,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+
+    try:
+        book_id = int(params.get('bookId'))
+        limit = min(max(int(params.get('limit', LIMIT_DEFAULT)), 1), TOP_N)
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Book ID required'}),
+            'isBase64Encoded': False
+        }
+
+    recommendations = [
+        {'bookId': other_id, 'score': round(score, 4)}
+        for other_id, score in get_index().similar(book_id, limit)
+    ]
+
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps({'bookId': book_id, 'recommendations': recommendations}),
+        'isBase64Encoded': False
+    }
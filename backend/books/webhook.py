@@ -0,0 +1,83 @@
+import hashlib
+import os
+from typing import Dict, Any
+
+from db import connect, SCHEMA_NAME
+
+
+def handle(event: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Обработка HTTP-уведомлений ЮMoney о поступлении оплаты
+    Args: event с body в формате application/x-www-form-urlencoded
+    Returns: HTTP response 200 OK либо 400 при неверной подписи
+    '''
+    secret_key = os.environ.get('YOOMONEY_SECRET_KEY')
+    body_str = event.get('body', '')
+    params = {}
+    
+    if body_str:
+        for pair in body_str.split('&'):
+            if '=' in pair:
+                key, value = pair.split('=', 1)
+                params[key] = value
+    
+    notification_type = params.get('notification_type')
+    operation_id = params.get('operation_id')
+    amount = params.get('amount')
+    currency = params.get('currency')
+    datetime_str = params.get('datetime')
+    sender = params.get('sender')
+    codepro = params.get('codepro')
+    label = params.get('label')
+    sha1_hash = params.get('sha1_hash')
+    
+    hash_string = f"{notification_type}&{operation_id}&{amount}&{currency}&{datetime_str}&{sender}&{codepro}&{secret_key}&{label}"
+    calculated_hash = hashlib.sha1(hash_string.encode()).hexdigest()
+    
+    if calculated_hash != sha1_hash:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'text/plain'},
+            'body': 'Invalid signature',
+            'isBase64Encoded': False
+        }
+    
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        if label:
+            parts = label.split('_')
+            if len(parts) >= 3:
+                user_email = parts[0]
+                book_id = int(parts[1])
+                purchase_type = parts[2]
+                
+                cursor.execute(f'''
+                    SELECT id FROM {SCHEMA_NAME}.purchases 
+                    WHERE user_email = %s AND book_id = %s AND purchase_type = %s
+                ''', (user_email, book_id, purchase_type))
+                
+                if not cursor.fetchone():
+                    cursor.execute(f'''
+                        INSERT INTO {SCHEMA_NAME}.purchases (user_email, book_id, purchase_type, price, payment_id)
+                        VALUES (%s, %s, %s, %s, %s)
+                    ''', (user_email, book_id, purchase_type, float(amount), operation_id))
+                    
+                    import book_popularity
+                    book_popularity.record_sale(cursor, book_id)
+                    conn.commit()
+                    
+                    import recommendations
+                    recommendations.record_purchase(cursor, user_email, book_id)
+        
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'text/plain'},
+            'body': 'OK',
+            'isBase64Encoded': False
+        }
+        
+    finally:
+        cursor.close()
+        conn.close()
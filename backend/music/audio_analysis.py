@@ -0,0 +1,216 @@
+import base64
+import io
+import json
+import wave
+from typing import Dict, Any, Optional
+
+from db import connect, SCHEMA_NAME
+
+PEAKS_COUNT = 800
+DECODE_CHUNK_FRAMES = 65536
+
+
+class AudioAnalysisError(Exception):
+    pass
+
+
+class PeakAccumulator:
+    '''
+    Business: Собирает максимальные амплитуды по корзинам, получая сэмплы кусками
+    Args: total_frames - число кадров во всём файле, peaks_count - число корзин
+    Returns: накопитель, который не держит в памяти весь декодированный сигнал
+    '''
+
+    def __init__(self, total_frames: int, peaks_count: int = PEAKS_COUNT):
+        import numpy as np
+
+        self.total_frames = max(total_frames, 1)
+        self.peaks_count = peaks_count
+        self.peaks = np.zeros(peaks_count, dtype=np.float32)
+        self.position = 0
+
+    def add(self, amplitudes) -> None:
+        '''amplitudes - модуль амплитуды кадров в долях полной шкалы (0..1), моно'''
+        import numpy as np
+
+        if not len(amplitudes):
+            return
+        positions = np.arange(self.position, self.position + len(amplitudes), dtype=np.int64)
+        buckets = np.minimum(positions * self.peaks_count // self.total_frames, self.peaks_count - 1)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        chunk_peaks = np.maximum.reduceat(amplitudes, starts)
+        self.peaks[buckets[starts]] = np.maximum(self.peaks[buckets[starts]], chunk_peaks)
+        self.position += len(amplitudes)
+
+    def to_bytes(self) -> bytes:
+        import numpy as np
+
+        return np.clip(np.round(self.peaks * 255), 0, 255).astype(np.uint8).tobytes()
+
+
+def _analyze_wav(data: bytes) -> Dict[str, Any]:
+    import numpy as np
+
+    try:
+        reader = wave.open(io.BytesIO(data), 'rb')
+    except (wave.Error, EOFError) as error:
+        raise AudioAnalysisError(f'Unsupported WAV file: {error}')
+
+    with reader:
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        frame_rate = reader.getframerate()
+        total_frames = reader.getnframes()
+        full_scale = float(1 << (8 * sample_width - 1))
+        accumulator = PeakAccumulator(total_frames)
+
+        while True:
+            frames = reader.readframes(DECODE_CHUNK_FRAMES)
+            if not frames:
+                break
+            if sample_width == 1:
+                samples = np.frombuffer(frames, dtype=np.uint8).astype(np.int32) - 128
+            elif sample_width == 3:
+                raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+                samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+                samples = np.where(samples & 0x800000, samples - 0x1000000, samples)
+            else:
+                samples = np.frombuffer(frames, dtype=f'<i{sample_width}').astype(np.int64)
+            amplitudes = np.abs(samples.reshape(-1, channels)).max(axis=1) / full_scale
+            accumulator.add(amplitudes.astype(np.float32))
+
+    return {
+        'durationSeconds': round(total_frames / frame_rate),
+        'bitrate': frame_rate * sample_width * 8 * channels,
+        'peaks': accumulator.to_bytes()
+    }
+
+
+def _analyze_mp3(data: bytes) -> Dict[str, Any]:
+    import miniaudio
+    import numpy as np
+
+    try:
+        info = miniaudio.mp3_get_info(data)
+    except miniaudio.DecodeError as error:
+        raise AudioAnalysisError(f'Unsupported MP3 file: {error}')
+
+    accumulator = PeakAccumulator(info.num_frames)
+    # Декодируем потоком в моно, чтобы не держать в памяти весь PCM-сигнал
+    stream = miniaudio.stream_memory(
+        data,
+        output_format=miniaudio.SampleFormat.SIGNED16,
+        nchannels=1,
+        sample_rate=info.sample_rate,
+        frames_to_read=DECODE_CHUNK_FRAMES
+    )
+    for chunk in stream:
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.int32)
+        accumulator.add((np.abs(samples) / 32768.0).astype(np.float32))
+
+    duration = info.num_frames / info.sample_rate if info.sample_rate else 0
+    return {
+        'durationSeconds': round(duration),
+        'bitrate': round(len(data) * 8 / duration) if duration else None,
+        'peaks': accumulator.to_bytes()
+    }
+
+
+def analyze_audio(data: bytes) -> Dict[str, Any]:
+    '''
+    Business: Вычисляет длительность, битрейт и огибающую (peaks) аудиофайла
+    Args: data - содержимое WAV или MP3 файла
+    Returns: словарь durationSeconds, bitrate, peaks (PEAKS_COUNT байт uint8, 255 = полная шкала)
+    '''
+    if data[:4] == b'RIFF' and data[8:12] == b'WAVE':
+        return _analyze_wav(data)
+    if data[:3] == b'ID3' or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return _analyze_mp3(data)
+    raise AudioAnalysisError('Unsupported audio format, expected WAV or MP3')
+
+
+def analyze_track(cursor, track_id: int, audio_url: str) -> Optional[Dict[str, Any]]:
+    '''
+    Business: Обрабатывает аудио трека при сохранении и записывает метаданные в music_tracks
+    Args: cursor - курсор открытой транзакции, track_id, audio_url
+    Returns: результат анализа или None, если файл недоступен или формат не поддерживается
+    '''
+    import audio_store
+
+    try:
+        result = analyze_audio(audio_store.read_audio(audio_url))
+    except (audio_store.AudioSourceError, AudioAnalysisError) as error:
+        print(f'Audio analysis skipped for track {track_id}: {error}')
+        return None
+
+    cursor.execute(f'''
+        UPDATE {SCHEMA_NAME}.music_tracks
+        SET duration_seconds = %s, bitrate = %s, waveform_peaks = %s, analyzed_at = CURRENT_TIMESTAMP,
+            duration = CASE WHEN duration = '' THEN %s ELSE duration END
+        WHERE id = %s
+    ''', (
+        result['durationSeconds'],
+        result['bitrate'],
+        result['peaks'],
+        f"{result['durationSeconds'] // 60}:{result['durationSeconds'] % 60:02d}",
+        track_id
+    ))
+    return result
+
+
+def get_peaks(params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Отдаёт предвычисленную огибающую трека для отрисовки waveform без декодирования
+    Args: params с id трека
+    Returns: HTTP response с peaks в base64 (uint8), длительностью и битрейтом
+    '''
+    track_id = params.get('id')
+
+    if not track_id or not str(track_id).isdigit():
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Track ID required'}),
+            'isBase64Encoded': False
+        }
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'''
+            SELECT duration_seconds, bitrate, waveform_peaks
+            FROM {SCHEMA_NAME}.music_tracks WHERE id = %s
+        ''', (int(track_id),))
+        row = cursor.fetchone()
+
+        if not row or row[2] is None:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Waveform not found'}),
+                'isBase64Encoded': False
+            }
+
+        peaks = bytes(row[2])
+
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Cache-Control': 'public, max-age=3600'
+            },
+            'body': json.dumps({
+                'id': int(track_id),
+                'durationSeconds': row[0],
+                'bitrate': row[1],
+                'peaksCount': len(peaks),
+                'peaks': base64.b64encode(peaks).decode('ascii')
+            }),
+            'isBase64Encoded': False
+        }
+
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,275 @@
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from byte_ranges import MAX_CHUNK_BYTES, parse_range
+from db import connect, SCHEMA_NAME
+
+AUDIO_CACHE_DIR = os.environ.get('AUDIO_CACHE_DIR', '/tmp/audio-cache')
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get('AUDIO_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+ORIGIN_TIMEOUT_SECONDS = 30
+ORIGIN_READ_CHUNK = 256 * 1024
+
+
+class DiskLRUCache:
+    '''
+    Business: Ограниченный по объёму дисковый кэш файлов с вытеснением давно не читанных
+    Args: root - каталог кэша, max_bytes - предельный суммарный размер
+    Returns: кэш, заполняющийся из источника при промахе; параллельные промахи по одному
+             ключу схлопываются в одну загрузку
+    '''
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, int]' = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.inflight: Dict[str, threading.Event] = {}
+
+        os.makedirs(root, exist_ok=True)
+        # Файлы, оставшиеся от предыдущего запуска тёплого контейнера, - в порядке последнего доступа
+        existing = []
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.endswith('.part'):
+                os.remove(path)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                existing.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self.entries[name] = size
+            self.total_bytes += size
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def open_entry(self, key: str, fill):
+        '''
+        Business: Открывает закэшированный файл, при промахе заполняя его через fill(path)
+        Args: key - ключ файла, fill - функция, записывающая содержимое во временный путь
+        Returns: файл, открытый на чтение под блокировкой кэша: вытеснение другим потоком
+                 удаляет только имя, и уже открытый файл дочитывается целиком
+        '''
+        while True:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return open(self.path(key), 'rb')
+                event = self.inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self.inflight[key] = event
+                    self.misses += 1
+                    break
+            # Файл уже загружает другой поток - ждём и читаем из кэша
+            event.wait()
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return open(self.path(key), 'rb')
+
+        temp_path = self.path(key) + '.part'
+        try:
+            fill(temp_path)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, self.path(key))
+            with self.lock:
+                self.entries[key] = size
+                self.total_bytes += size
+                self._evict(keep=key)
+                return open(self.path(key), 'rb')
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            with self.lock:
+                self.inflight.pop(key, None)
+            event.set()
+
+    def _evict(self, keep: str) -> None:
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, size = next(iter(self.entries.items()))
+            if key == keep:
+                self.entries.move_to_end(key)
+                continue
+            del self.entries[key]
+            self.total_bytes -= size
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRatio': round(self.hits / requests, 4) if requests else 0.0,
+                'files': len(self.entries),
+                'bytes': self.total_bytes,
+                'maxBytes': self.max_bytes
+            }
+
+
+_cache: Optional[DiskLRUCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DiskLRUCache:
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskLRUCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES)
+        return _cache
+
+
+def fetch_origin(audio_url: str, path: str) -> None:
+    '''
+    Business: Скачивает аудио с исходного сервера кусками прямо в файл
+    Args: audio_url - адрес на origin, path - куда писать
+    Returns: None; OSError при ошибке сети или превышении MAX_AUDIO_BYTES
+    '''
+    import audio_store
+
+    written = 0
+    with urllib.request.urlopen(audio_url, timeout=ORIGIN_TIMEOUT_SECONDS) as response, open(path, 'wb') as cache_file:
+        while True:
+            chunk = response.read(ORIGIN_READ_CHUNK)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > audio_store.MAX_AUDIO_BYTES:
+                raise OSError(f'Audio file is larger than {audio_store.MAX_AUDIO_BYTES} bytes')
+            cache_file.write(chunk)
+
+
+def stream(event: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Прокси для прослушивания трека с Range; удалённое аудио читается через дисковый LRU-кэш
+    Args: event с заголовком Range, params с id трека
+    Returns: HTTP response 200/206 с частью аудио, 404 без трека, 416 для неверного Range, 502 при сбое origin
+    '''
+    import audio_store
+
+    track_id = params.get('id')
+
+    if not track_id or not str(track_id).isdigit():
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Track ID required'}),
+            'isBase64Encoded': False
+        }
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(f'SELECT audio_url FROM {SCHEMA_NAME}.music_tracks WHERE id = %s', (int(track_id),))
+        row = cursor.fetchone()
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not row:
+        return {
+            'statusCode': 404,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Track not found'}),
+            'isBase64Encoded': False
+        }
+
+    audio_url = row[0]
+    payload = None
+    audio_file = None
+    try:
+        if audio_url.startswith(('http://', 'https://')):
+            # Ключ зависит от адреса, поэтому смена audio_url не отдаёт устаревший файл
+            key = f'{int(track_id)}-{hashlib.sha1(audio_url.encode()).hexdigest()[:16]}'
+            audio_file = get_cache().open_entry(key, lambda temp_path: fetch_origin(audio_url, temp_path))
+        elif audio_url.startswith('data:'):
+            payload = audio_store.read_audio(audio_url)
+        else:
+            audio_file = open(audio_store.local_path(audio_url), 'rb')
+        size = len(payload) if payload is not None else os.fstat(audio_file.fileno()).st_size
+    except (OSError, audio_store.AudioSourceError) as error:
+        print(f'Audio stream failed for track {track_id}: {error}')
+        return {
+            'statusCode': 502,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Audio source unavailable'}),
+            'isBase64Encoded': False
+        }
+
+    try:
+        response_headers = {
+            'Content-Type': mimetypes.guess_type(audio_url.split('?')[0])[0] or 'audio/mpeg',
+            'Accept-Ranges': 'bytes',
+            'Cache-Control': 'public, max-age=86400',
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Expose-Headers': 'Content-Range, Accept-Ranges'
+        }
+        if audio_url.startswith('data:'):
+            response_headers['Content-Type'] = audio_url[len('data:'):].split(';')[0] or 'audio/mpeg'
+
+        headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+        try:
+            requested = parse_range(headers.get('range'), size)
+        except ValueError:
+            response_headers['Content-Range'] = f'bytes */{size}'
+            return {
+                'statusCode': 416,
+                'headers': response_headers,
+                'body': '',
+                'isBase64Encoded': False
+            }
+
+        start, end = requested if requested else (0, size - 1)
+        end = min(end, start + MAX_CHUNK_BYTES - 1)
+        if payload is not None:
+            chunk = payload[start:end + 1]
+        else:
+            audio_file.seek(start)
+            chunk = audio_file.read(end - start + 1)
+
+        is_partial = requested is not None or len(chunk) < size
+        if is_partial:
+            response_headers['Content-Range'] = f'bytes {start}-{start + len(chunk) - 1}/{size}'
+
+        return {
+            'statusCode': 206 if is_partial else 200,
+            'headers': response_headers,
+            'body': base64.b64encode(chunk).decode('ascii'),
+            'isBase64Encoded': True
+        }
+
+    finally:
+        if audio_file is not None:
+            audio_file.close()
+
+
+def cache_stats() -> Dict[str, Any]:
+    '''
+    Business: Статистика дискового кэша аудио этого экземпляра функции
+    Args: нет
+    Returns: HTTP response с попаданиями, промахами, hitRatio и занятым объёмом
+    '''
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+        'body': json.dumps(get_cache().stats()),
+        'isBase64Encoded': False
+    }
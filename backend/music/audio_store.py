@@ -0,0 +1,58 @@
+import base64
+import os
+import urllib.request
+
+AUDIO_STORE_DIR = os.environ.get('AUDIO_STORE_DIR', '/tmp/audio-store')
+FETCH_TIMEOUT_SECONDS = 30
+MAX_AUDIO_BYTES = 200 * 1024 * 1024
+
+
+class AudioSourceError(Exception):
+    pass
+
+
+def local_path(audio_url: str) -> str:
+    '''
+    Business: Переводит file:// или относительный адрес трека в путь внутри локального хранилища
+    Args: audio_url - адрес из music_tracks.audio_url
+    Returns: абсолютный путь; выход за пределы AUDIO_STORE_DIR запрещён
+    '''
+    relative = audio_url[len('file://'):] if audio_url.startswith('file://') else audio_url
+    root = os.path.realpath(AUDIO_STORE_DIR)
+    path = os.path.realpath(os.path.join(root, relative.lstrip('/')))
+    if os.path.commonpath([root, path]) != root:
+        raise AudioSourceError(f'Path outside of audio store: {audio_url}')
+    return path
+
+
+def read_audio(audio_url: str) -> bytes:
+    '''
+    Business: Загружает аудиофайл трека из data:-адреса, по HTTP(S) или из локального хранилища
+    Args: audio_url - адрес из music_tracks.audio_url
+    Returns: содержимое файла; AudioSourceError, если файл недоступен или больше MAX_AUDIO_BYTES
+    '''
+    if audio_url.startswith('data:'):
+        header, _, payload = audio_url.partition(',')
+        if not header.endswith(';base64'):
+            raise AudioSourceError('Only base64 data URLs are supported')
+        try:
+            return base64.b64decode(payload)
+        except ValueError as error:
+            raise AudioSourceError(f'Invalid data URL: {error}')
+
+    if audio_url.startswith(('http://', 'https://')):
+        try:
+            with urllib.request.urlopen(audio_url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+                data = response.read(MAX_AUDIO_BYTES + 1)
+        except OSError as error:
+            raise AudioSourceError(f'Failed to fetch {audio_url}: {error}')
+    else:
+        try:
+            with open(local_path(audio_url), 'rb') as audio_file:
+                data = audio_file.read(MAX_AUDIO_BYTES + 1)
+        except OSError as error:
+            raise AudioSourceError(f'Failed to read {audio_url}: {error}')
+
+    if len(data) > MAX_AUDIO_BYTES:
+        raise AudioSourceError(f'Audio file is larger than {MAX_AUDIO_BYTES} bytes')
+    return data
@@ -0,0 +1,35 @@
+from typing import Optional, Tuple
+
+# Ответ функции не стримится, поэтому большие файлы отдаются частями по Range.
+# Тело ответа не больше 3 МБ, а base64 увеличивает часть на треть: часть - 3/4 лимита
+# за вычетом запаса на заголовки ответа
+MAX_CHUNK_BYTES = 3 * 1024 * 1024 * 3 // 4 - 64 * 1024
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    '''
+    Business: Разбирает заголовок Range с одним диапазоном байт
+    Args: header - значение Range, size - размер файла
+    Returns: (start, end) включительно, None если Range нет или он не поддерживается;
+             ValueError, если диапазон невыполним (в том числе bytes=-0)
+    '''
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first == '':
+            length = int(last)
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if first == '':
+        if length <= 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
@@ -0,0 +1,94 @@
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+from db import connect, SCHEMA_NAME
+
+TRENDING_EPOCH = '2025-01-01'
+TRENDING_HALF_LIFE_DAYS = 7
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60)
+
+# trending_score = ln(SUM(exp(DECAY_RATE * (t - TRENDING_EPOCH)))) по прослушиваниям,
+# та же шкала, что и у book_popularity в функции books
+PLAY_SCORE_SQL = f"EXTRACT(EPOCH FROM (LOCALTIMESTAMP - TIMESTAMP '{TRENDING_EPOCH}')) * {DECAY_RATE!r}"
+# Повторное прослушивание того же трека тем же клиентом в пределах окна не учитывается:
+# перемотка и повторы не должны накручивать популярность
+PLAY_DEDUPE_SECONDS = 10 * 60
+MAX_TRACKED_PLAYS = 100000
+
+_recent_plays: 'OrderedDict[Tuple[str, int], float]' = OrderedDict()
+_recent_plays_lock = threading.Lock()
+
+
+def is_repeat_play(client: str, track_id: int) -> bool:
+    '''
+    Business: Проверяет, учитывалось ли уже прослушивание трека клиентом в окне PLAY_DEDUPE_SECONDS
+    Args: client - ключ клиента из rate_limit.client_key, track_id
+    Returns: True для повтора; иначе запоминает прослушивание и возвращает False
+    '''
+    now = time.monotonic()
+    key = (client, track_id)
+    with _recent_plays_lock:
+        played_at = _recent_plays.get(key)
+        if played_at is not None and now - played_at < PLAY_DEDUPE_SECONDS:
+            return True
+        _recent_plays.pop(key, None)
+        _recent_plays[key] = now
+        while len(_recent_plays) > MAX_TRACKED_PLAYS:
+            _recent_plays.popitem(last=False)
+        return False
+
+
+def record_play(event: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+    '''
+    Business: Учитывает прослушивание трека в материализованной популярности
+    Args: event запроса (для ключа клиента), params с id трека
+    Returns: HTTP response 204 (повтор в окне PLAY_DEDUPE_SECONDS - без записи) либо 400 без id
+    '''
+    track_id = params.get('id')
+    
+    if not track_id or not str(track_id).isdigit():
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Track ID required'}),
+            'isBase64Encoded': False
+        }
+    
+    import rate_limit
+    if is_repeat_play(rate_limit.client_key(event), int(track_id)):
+        return {
+            'statusCode': 204,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(f'''
+            INSERT INTO {SCHEMA_NAME}.track_popularity AS p (track_id, plays_count, trending_score, updated_at)
+            VALUES (%s, 1, {PLAY_SCORE_SQL}, CURRENT_TIMESTAMP)
+            ON CONFLICT (track_id) DO UPDATE SET
+                plays_count = p.plays_count + 1,
+                trending_score = GREATEST(p.trending_score, EXCLUDED.trending_score)
+                    + LN(1 + EXP(GREATEST(-ABS(p.trending_score - EXCLUDED.trending_score), -700))),
+                updated_at = CURRENT_TIMESTAMP
+        ''', (int(track_id),))
+        conn.commit()
+        
+        return {
+            'statusCode': 204,
+            'headers': {'Access-Control-Allow-Origin': '*'},
+            'body': '',
+            'isBase64Encoded': False
+        }
+    
+    finally:
+        cursor.close()
+        conn.close()
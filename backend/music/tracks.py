@@ -0,0 +1,225 @@
+import json
+from typing import Dict, Any, List
+
+from db import connect, SCHEMA_NAME
+
+# sort=trending|popular читают материализованную популярность из track_popularity
+LIST_ORDERING = {
+    'new': 't.created_at DESC',
+    'trending': 'p.trending_score DESC NULLS LAST, t.created_at DESC',
+    'popular': 'p.plays_count DESC NULLS LAST, t.created_at DESC',
+    'duration': 't.duration_seconds ASC NULLS LAST, t.created_at DESC'
+}
+
+MAX_IDS_PER_REQUEST = 100
+
+
+def parse_ids(raw_ids: str) -> List[int]:
+    '''
+    Business: Разбирает параметр ids=1,2,3 без дублей с сохранением порядка
+    Args: raw_ids - строка id через запятую
+    Returns: список id; ValueError при нечисловом id или превышении MAX_IDS_PER_REQUEST
+    '''
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw_ids.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError('Invalid ids')
+    if len(ids) > MAX_IDS_PER_REQUEST:
+        raise ValueError(f'Too many ids, max {MAX_IDS_PER_REQUEST}')
+    return ids
+
+
+def handle(event: Dict[str, Any], method: str) -> Dict[str, Any]:
+    '''
+    Business: API музыкальных треков - получение, добавление, редактирование, удаление
+    Args: event с httpMethod (GET/POST/PUT/DELETE), body для POST/PUT, queryStringParameters для DELETE
+    Returns: HTTP response с данными треков или статусом операции
+    '''
+    conn = connect()
+    cursor = conn.cursor()
+    
+    try:
+        if method == 'GET':
+            params = event.get('queryStringParameters') or {}
+            stats = params.get('stats')
+            
+            if stats == 'true':
+                cursor.execute(f'SELECT COUNT(*) FROM {SCHEMA_NAME}.music_tracks')
+                tracks_count = cursor.fetchone()[0]
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'tracksCount': tracks_count}),
+                    'isBase64Encoded': False
+                }
+            
+            ids = None
+            if params.get('ids') is not None:
+                try:
+                    ids = parse_ids(params['ids'])
+                except ValueError as error:
+                    return {
+                        'statusCode': 400,
+                        'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                        'body': json.dumps({'error': str(error)}),
+                        'isBase64Encoded': False
+                    }
+            
+            order_by = LIST_ORDERING.get(params.get('sort'), LIST_ORDERING['new'])
+            where_clause = 'WHERE t.id = ANY(%s)' if ids is not None else ''
+            cursor.execute(f'''
+                SELECT t.id, t.title, t.artist, t.duration, t.cover, t.audio_url, t.is_adult_content, t.genre, t.year, t.price,
+                       t.duration_seconds
+                FROM {SCHEMA_NAME}.music_tracks t
+                LEFT JOIN {SCHEMA_NAME}.track_popularity p ON p.track_id = t.id
+                {where_clause}
+                ORDER BY {order_by}
+            ''', (ids,) if ids is not None else None)
+            
+            rows = cursor.fetchall()
+            if ids is not None:
+                rows_by_id = {row[0]: row for row in rows}
+                rows = [rows_by_id[track_id] for track_id in ids if track_id in rows_by_id]
+            
+            tracks = []
+            for row in rows:
+                tracks.append({
+                    'id': row[0],
+                    'title': row[1],
+                    'artist': row[2],
+                    'duration': row[3],
+                    'cover': row[4],
+                    'audioUrl': row[5],
+                    'isAdultContent': row[6],
+                    'genre': row[7] or '',
+                    'year': row[8] or 0,
+                    'price': row[9] or 0,
+                    'durationSeconds': row[10]
+                })
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'tracks': tracks, 'missingIds': [track_id for track_id in ids if track_id not in rows_by_id]}
+                                   if ids is not None else {'tracks': tracks}),
+                'isBase64Encoded': False
+            }
+        
+        elif method == 'POST':
+            body_data = json.loads(event.get('body', '{}'))
+            
+            title = body_data['title'].replace("'", "''")
+            artist = body_data['artist'].replace("'", "''")
+            duration = body_data['duration'].replace("'", "''") if body_data.get('duration') else ''
+            cover = body_data.get('cover', '').replace("'", "''")
+            audio_url = body_data['audioUrl'].replace("'", "''")
+            is_adult = 'true' if body_data.get('isAdultContent', False) else 'false'
+            genre = body_data.get('genre', '').replace("'", "''")
+            year = int(body_data.get('year', 0)) if body_data.get('year') else 'NULL'
+            price = int(body_data.get('price', 0)) if body_data.get('price') is not None else 0
+            
+            cursor.execute(f'''
+                INSERT INTO {SCHEMA_NAME}.music_tracks (title, artist, duration, cover, audio_url, is_adult_content, genre, year, price)
+                VALUES ('{title}', '{artist}', '{duration}', '{cover}', '{audio_url}', {is_adult}, '{genre}', {year}, {price})
+                RETURNING id
+            ''')
+            
+            track_id = cursor.fetchone()[0]
+            conn.commit()
+            
+            import audio_analysis
+            if audio_analysis.analyze_track(cursor, track_id, body_data['audioUrl']):
+                conn.commit()
+            
+            return {
+                'statusCode': 201,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'id': track_id, 'message': 'Track created'}),
+                'isBase64Encoded': False
+            }
+        
+        elif method == 'PUT':
+            body_data = json.loads(event.get('body', '{}'))
+            track_id = body_data.get('id')
+            
+            if not track_id:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Track ID required'}),
+                    'isBase64Encoded': False
+                }
+            
+            title = body_data['title'].replace("'", "''")
+            artist = body_data['artist'].replace("'", "''")
+            duration = body_data['duration'].replace("'", "''") if body_data.get('duration') else ''
+            cover = body_data.get('cover', '').replace("'", "''")
+            audio_url = body_data['audioUrl'].replace("'", "''")
+            is_adult = 'true' if body_data.get('isAdultContent', False) else 'false'
+            genre = body_data.get('genre', '').replace("'", "''")
+            year = int(body_data.get('year', 0)) if body_data.get('year') else 'NULL'
+            price = int(body_data.get('price', 0)) if body_data.get('price') is not None else 0
+            
+            cursor.execute(f'SELECT audio_url, analyzed_at FROM {SCHEMA_NAME}.music_tracks WHERE id = %s', (int(track_id),))
+            previous = cursor.fetchone()
+            
+            cursor.execute(f'''
+                UPDATE {SCHEMA_NAME}.music_tracks 
+                SET title = '{title}', 
+                    artist = '{artist}', 
+                    duration = '{duration}', 
+                    cover = '{cover}', 
+                    audio_url = '{audio_url}', 
+                    is_adult_content = {is_adult},
+                    genre = '{genre}',
+                    year = {year},
+                    price = {price}
+                WHERE id = {int(track_id)}
+            ''')
+            conn.commit()
+            
+            if previous and (previous[0] != body_data['audioUrl'] or previous[1] is None):
+                import audio_analysis
+                if audio_analysis.analyze_track(cursor, int(track_id), body_data['audioUrl']):
+                    conn.commit()
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'id': track_id, 'message': 'Track updated'}),
+                'isBase64Encoded': False
+            }
+        
+        elif method == 'DELETE':
+            params = event.get('queryStringParameters') or {}
+            track_id = params.get('id')
+            
+            if not track_id:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Track ID required'}),
+                    'isBase64Encoded': False
+                }
+            
+            cursor.execute(f'DELETE FROM {SCHEMA_NAME}.music_tracks WHERE id = {int(track_id)}')
+            conn.commit()
+            
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'message': 'Track deleted'}),
+                'isBase64Encoded': False
+            }
+        
+        return {
+            'statusCode': 405,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': 'Method not allowed'}),
+            'isBase64Encoded': False
+        }
+        
+    finally:
+        cursor.close()
+        conn.close()
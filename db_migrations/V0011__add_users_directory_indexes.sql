@@ -0,0 +1,6 @@
+-- Индекс для keyset-пагинации списка пользователей
+CREATE INDEX IF NOT EXISTS idx_users_created_at_id ON users(created_at DESC, id DESC);
+
+-- Индексы для регистронезависимого поиска по префиксу email и имени
+CREATE INDEX IF NOT EXISTS idx_users_email_lower_prefix ON users(LOWER(email) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_name_lower_prefix ON users(LOWER(name) text_pattern_ops);
@@ -0,0 +1,35 @@
+-- Материализованная популярность книг: число продаж и трендовый рейтинг с экспоненциальным затуханием.
+-- trending_score хранится в логарифмической шкале: ln(SUM(exp(rate * (purchased_at - 2025-01-01)))),
+-- поэтому его не нужно пересчитывать со временем - порядок по нему совпадает с порядком по затухшему рейтингу.
+CREATE TABLE IF NOT EXISTS book_popularity (
+    book_id INTEGER PRIMARY KEY,
+    sales_count INTEGER NOT NULL DEFAULT 0,
+    trending_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- То же для треков по числу прослушиваний
+CREATE TABLE IF NOT EXISTS track_popularity (
+    track_id INTEGER PRIMARY KEY,
+    plays_count INTEGER NOT NULL DEFAULT 0,
+    trending_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_book_popularity_trending ON book_popularity(trending_score DESC);
+CREATE INDEX IF NOT EXISTS idx_book_popularity_sales ON book_popularity(sales_count DESC);
+CREATE INDEX IF NOT EXISTS idx_track_popularity_trending ON track_popularity(trending_score DESC);
+CREATE INDEX IF NOT EXISTS idx_track_popularity_plays ON track_popularity(plays_count DESC);
+
+-- Начальное заполнение по уже совершённым покупкам (период полураспада 7 дней)
+INSERT INTO book_popularity (book_id, sales_count, trending_score)
+SELECT book_id, COUNT(*), max_x + LN(SUM(EXP(GREATEST(x - max_x, -700))))
+FROM (
+    SELECT book_id, x, MAX(x) OVER (PARTITION BY book_id) AS max_x
+    FROM (
+        SELECT book_id, EXTRACT(EPOCH FROM (purchased_at - TIMESTAMP '2025-01-01')) * 1.1460766874337719e-06 AS x
+        FROM purchases
+    ) sales
+) scored
+GROUP BY book_id, max_x
+ON CONFLICT (book_id) DO NOTHING;
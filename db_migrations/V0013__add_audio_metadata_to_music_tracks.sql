@@ -0,0 +1,8 @@
+-- Метаданные, вычисляемые при сохранении трека: точная длительность, битрейт и огибающая для waveform
+ALTER TABLE music_tracks
+ADD COLUMN IF NOT EXISTS duration_seconds INTEGER,
+ADD COLUMN IF NOT EXISTS bitrate INTEGER,
+ADD COLUMN IF NOT EXISTS waveform_peaks BYTEA,
+ADD COLUMN IF NOT EXISTS analyzed_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_music_tracks_duration_seconds ON music_tracks(duration_seconds);
@@ -0,0 +1,2 @@
+-- Проверка владения книгой перед скачиванием одним индексным поиском
+CREATE INDEX IF NOT EXISTS idx_purchases_user_email_book_id ON purchases(user_email, book_id);
@@ -0,0 +1,9 @@
+-- Общие вёдра токенов ограничения частоты запросов (RATE_LIMIT_STORE=postgres);
+-- UNLOGGED: потеря вёдер при сбое БД безопасна, а запись дешевле
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    client_key VARCHAR(255) PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_updated_at ON rate_limit_buckets(updated_at);
@@ -0,0 +1,16 @@
+-- Уменьшенные обложки книг (WebP/JPEG разной ширины), создаются при сохранении книги;
+-- cover_version - хэш исходной обложки, меняется вместе с ней и сбрасывает кэш браузеров
+ALTER TABLE books ADD COLUMN IF NOT EXISTS cover_version VARCHAR(32);
+
+UPDATE books SET cover_version = SUBSTRING(MD5(cover) FROM 1 FOR 12)
+WHERE cover_version IS NULL AND (cover LIKE 'data:image/%' OR cover LIKE 'http://%' OR cover LIKE 'https://%');
+
+CREATE TABLE IF NOT EXISTS book_cover_variants (
+    book_id INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    format VARCHAR(8) NOT NULL,
+    version VARCHAR(32) NOT NULL,
+    content BYTEA NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (book_id, width, format)
+);
@@ -0,0 +1,2 @@
+-- Выгрузка покупок за период читает диапазон по дате с keyset-курсором (purchased_at, id)
+CREATE INDEX IF NOT EXISTS idx_purchases_purchased_at_id ON purchases(purchased_at, id);
@@ -0,0 +1,10 @@
+-- Версия каталога: увеличивается в той же транзакции, что и запись в books,
+-- по ней тёплые экземпляры функции books узнают, что снимок каталога в памяти устарел
+CREATE TABLE IF NOT EXISTS catalog_versions (
+    catalog VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO catalog_versions (catalog, version) VALUES ('books', 0)
+ON CONFLICT (catalog) DO NOTHING;
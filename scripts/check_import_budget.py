@@ -0,0 +1,95 @@
+'''
+Business: Замер стоимости импорта модулей облачных функций из backend/
+Args: --budget-ms (бюджет на импорт index.py), --routes (замерить и модули маршрутов), --top N
+Returns: отчёт по модулям; код выхода 1, если index.py какой-либо функции превышает бюджет
+'''
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+DEFAULT_BUDGET_MS = 50.0
+# Тяжёлые зависимости, которые функции импортируют лениво, - для справки в отчёте
+LAZY_DEPENDENCIES = ['psycopg2', 'hashlib']
+
+
+def measure_import(function_dir: str, module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    '''
+    Business: Импортирует модуль в чистом интерпретаторе с -X importtime
+    Args: function_dir - каталог функции, module - имя модуля
+    Returns: общая стоимость импорта в мс и список (модуль, мс) по вложенным импортам
+    '''
+    env = dict(os.environ, PYTHONPATH=function_dir, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=function_dir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'{function_dir}: import {module} failed\n{result.stderr}')
+    
+    lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if not parts[0].strip().isdigit():
+            continue
+        lines.append((parts[2].rstrip(), int(parts[1]) / 1000))
+    
+    # Вложенные импорты печатаются перед родителем с дополнительным отступом
+    total_ms = 0.0
+    nested: Dict[str, float] = {}
+    for position, (name, cumulative_ms) in enumerate(lines):
+        if name == f' {module}':
+            total_ms = cumulative_ms
+            for nested_name, nested_ms in reversed(lines[:position]):
+                if not nested_name.startswith('  '):
+                    break
+                nested[nested_name.strip()] = max(nested.get(nested_name.strip(), 0.0), nested_ms)
+            break
+    
+    return total_ms, sorted(nested.items(), key=lambda item: item[1], reverse=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Import-time budget check for backend functions')
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--routes', action='store_true', help='also report the cost of each route module')
+    parser.add_argument('--top', type=int, default=5, help='nested imports to list per module')
+    args = parser.parse_args()
+    
+    failed = False
+    for name in sorted(os.listdir(BACKEND_DIR)):
+        function_dir = os.path.abspath(os.path.join(BACKEND_DIR, name))
+        if not os.path.isfile(os.path.join(function_dir, 'index.py')):
+            continue
+        
+        modules = ['index']
+        if args.routes:
+            modules += sorted(
+                f[:-3] for f in os.listdir(function_dir)
+                if f.endswith('.py') and f != 'index.py'
+            )
+        
+        for module in modules:
+            total_ms, nested = measure_import(function_dir, module)
+            over_budget = module == 'index' and total_ms > args.budget_ms
+            failed = failed or over_budget
+            status = 'FAIL' if over_budget else 'ok'
+            print(f'{name}/{module}.py: {total_ms:.1f} ms [{status}]')
+            for nested_name, nested_ms in nested[:args.top]:
+                print(f'    {nested_name}: {nested_ms:.1f} ms')
+    
+    if args.routes:
+        for dependency in LAZY_DEPENDENCIES:
+            total_ms, _ = measure_import(BACKEND_DIR, dependency)
+            print(f'lazy dependency {dependency}: {total_ms:.1f} ms')
+    
+    print(f'budget for index.py: {args.budget_ms:.1f} ms')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
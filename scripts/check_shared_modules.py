@@ -0,0 +1,37 @@
+'''
+Business: Проверка, что общие модули функций из backend/ совпадают побайтно
+Args: нет
+Returns: код выхода 1, если копии общих модулей в auth/books/music разошлись (шлюз backend/api грузит только одну)
+'''
+import hashlib
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+# Модуль -> функции, в которых лежат его копии
+SHARED_MODULES = {
+    'db.py': ['auth', 'books', 'music'],
+    'rate_limit.py': ['auth', 'books', 'music'],
+    'byte_ranges.py': ['books', 'music']
+}
+
+
+def main() -> int:
+    failed = False
+    for module, functions in SHARED_MODULES.items():
+        digests = {}
+        for name in functions:
+            with open(os.path.join(BACKEND_DIR, name, module), 'rb') as module_file:
+                digests[name] = hashlib.sha256(module_file.read()).hexdigest()
+        if len(set(digests.values())) > 1:
+            failed = True
+            print(f'{module}: copies differ')
+            for name, digest in digests.items():
+                print(f'    {name}/{module}: {digest[:12]}')
+        else:
+            print(f'{module}: ok')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
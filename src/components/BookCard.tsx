@@ -5,6 +5,7 @@ import { Card } from '@/components/ui/card';
 import Icon from '@/components/ui/icon';
 import { useNavigate } from 'react-router-dom';
 import { AgeWarningDialog } from './AgeWarningDialog';
+import { CoverImage, type CoverVariants } from './CoverImage';
 import { useAuth } from '@/contexts/AuthContext';
 import { useBooks } from '@/contexts/BookContext';
 
@@ -14,6 +15,7 @@ interface Book {
   author: string;
   price: number;
   cover: string;
+  coverVariants?: CoverVariants;
   genre: string;
   description: string;
   rating: number;
@@ -81,9 +83,11 @@ export const BookCard = ({ book, index, isFavorite, onToggleFavorite, onAddToCar
         className="relative aspect-[2/3] overflow-hidden bg-gradient-to-br from-gray-50 to-gray-100 touch-manipulation rounded-t-lg cursor-pointer"
         onClick={handleCardClick}
       >
-        <img
-          src={book.cover}
+        <CoverImage
+          cover={book.cover}
+          coverVariants={book.coverVariants}
           alt={book.title}
+          sizes="(min-width: 1024px) 20vw, (min-width: 768px) 33vw, 50vw"
           className="object-cover w-full h-full group-hover:scale-105 transition-transform duration-300"
         />
         
@@ -0,0 +1,42 @@
+import { useState } from 'react';
+import funcUrls from '../../backend/func2url.json';
+
+export type CoverVariants = Record<string, Record<string, string>>;
+
+interface CoverImageProps {
+  cover: string;
+  coverVariants?: CoverVariants;
+  alt: string;
+  sizes: string;
+  className?: string;
+}
+
+const toSrcSet = (variants: Record<string, string>) =>
+  Object.entries(variants)
+    .map(([width, url]) => `${funcUrls.books}${url} ${width}w`)
+    .join(', ');
+
+// Браузер сам выбирает WebP нужной ширины, JPEG - запасной вариант, исходник - если копий нет
+// или копию не удалось загрузить
+export function CoverImage({ cover, coverVariants, alt, sizes, className }: CoverImageProps) {
+  const [variantsFailed, setVariantsFailed] = useState(false);
+
+  if (variantsFailed || !coverVariants?.webp || !coverVariants?.jpeg) {
+    return <img src={cover} alt={alt} className={className} loading="lazy" />;
+  }
+
+  return (
+    <picture>
+      <source type="image/webp" srcSet={toSrcSet(coverVariants.webp)} sizes={sizes} />
+      <img
+        src={`${funcUrls.books}${coverVariants.jpeg['320']}`}
+        srcSet={toSrcSet(coverVariants.jpeg)}
+        sizes={sizes}
+        alt={alt}
+        className={className}
+        loading="lazy"
+        onError={() => setVariantsFailed(true)}
+      />
+    </picture>
+  );
+}
@@ -5,6 +5,7 @@ import { useMusic } from '@/contexts/MusicContext';
 import { AudioVisualizer } from './MusicPlayer/AudioVisualizer';
 import { PlayerControls } from './MusicPlayer/PlayerControls';
 import { TrackInfo } from './MusicPlayer/TrackInfo';
+import funcUrls from '../../backend/func2url.json';
 
 export const MusicPlayer = () => {
   const { currentTrack, isPlaying, setIsPlaying, tracks, setCurrentTrack } = useMusic();
@@ -29,7 +30,10 @@ export const MusicPlayer = () => {
 
   useEffect(() => {
     if (audioRef.current && currentTrack) {
-      audioRef.current.src = currentTrack.audioUrl;
+      // Удалённое аудио идёт через кэширующий прокси функции music
+      audioRef.current.src = /^https?:\/\//.test(currentTrack.audioUrl)
+        ? `${funcUrls.music}?action=stream&id=${currentTrack.id}`
+        : currentTrack.audioUrl;
       audioRef.current.load();
       if (isPlaying) {
         audioRef.current.play();
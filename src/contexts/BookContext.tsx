@@ -15,6 +15,7 @@ export interface Book {
   price: number;
   discountPrice?: number;
   cover: string;
+  coverVariants?: Record<string, Record<string, string>>;
   description: string;
   formats: BookFormat[];
   badges?: string[];
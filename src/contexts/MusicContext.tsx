@@ -40,6 +40,13 @@ export const MusicProvider = ({ children }: { children: ReactNode }) => {
     fetchTracks();
   }, []);
 
+  useEffect(() => {
+    if (!currentTrack) return;
+    fetch(`${funcUrls.music}?action=play&id=${currentTrack.id}`, { method: 'POST' }).catch((error) => {
+      console.error('Failed to record play:', error);
+    });
+  }, [currentTrack?.id]);
+
   const fetchTracks = async () => {
     try {
       const response = await fetch(funcUrls.music);
@@ -0,0 +1,38 @@
+import funcUrls from '../../backend/func2url.json';
+
+const CONSISTENCY_HEADER = 'X-Consistency-Token';
+// После записи чтения какое-то время идут с токеном, чтобы реплика отдала свежие данные;
+// без токена GET остаются простыми CORS-запросами без preflight
+const TOKEN_TTL_MS = 30_000;
+
+let token: string | null = null;
+let tokenReceivedAt = 0;
+
+const isBackendUrl = (url: string) =>
+  Object.values(funcUrls as Record<string, string>).some((base) => url.startsWith(base));
+
+export function installConsistencyTokens() {
+  const originalFetch = window.fetch.bind(window);
+
+  window.fetch = async (input: RequestInfo | URL, init?: RequestInit) => {
+    const url = typeof input === 'string' ? input : input instanceof URL ? input.href : input.url;
+    if (!isBackendUrl(url)) {
+      return originalFetch(input, init);
+    }
+
+    let requestInit = init;
+    if (token && Date.now() - tokenReceivedAt < TOKEN_TTL_MS) {
+      const headers = new Headers(init?.headers);
+      headers.set(CONSISTENCY_HEADER, token);
+      requestInit = { ...init, headers };
+    }
+
+    const response = await originalFetch(input, requestInit);
+    const receivedToken = response.headers.get(CONSISTENCY_HEADER);
+    if (receivedToken) {
+      token = receivedToken;
+      tokenReceivedAt = Date.now();
+    }
+    return response;
+  };
+}
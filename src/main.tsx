@@ -2,5 +2,8 @@ import * as React from 'react';
 import { createRoot } from 'react-dom/client'
 import App from './App'
 import './index.css'
+import { installConsistencyTokens } from './lib/consistency'
+
+installConsistencyTokens();
 
 createRoot(document.getElementById("root")!).render(<App />);
\ No newline at end of file
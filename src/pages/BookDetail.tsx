@@ -7,12 +7,14 @@ import { AuthDialog } from '@/components/AuthDialog';
 import { CartDrawer } from '@/components/CartDrawer';
 import { AddBookDialog } from '@/components/AddBookDialog';
 import { useBooks } from '@/contexts/BookContext';
+import { CoverImage } from '@/components/CoverImage';
 import { useCart } from '@/contexts/CartContext';
 import { useAuth } from '@/contexts/AuthContext';
 import { usePurchases } from '@/contexts/PurchaseContext';
 import { useToast } from '@/hooks/use-toast';
 import Icon from '@/components/ui/icon';
 import { YooMoneyPayment } from '@/components/YooMoneyPayment';
+import funcUrls from '../../backend/func2url.json';
 
 const BookDetail = () => {
   const { id } = useParams();
@@ -74,7 +76,7 @@ const BookDetail = () => {
   const isDownloadFree = book.price === 0;
   const isEbookFree = book.ebookPrice === 0 || book.ebookPrice === null;
 
-  const handleDownload = () => {
+  const handleDownload = async () => {
     if (!isAuthenticated) {
       setAuthDialogOpen(true);
       toast({
@@ -95,16 +97,55 @@ const BookDetail = () => {
     }
 
     const format = book.formats?.find(f => f.format === selectedFormat);
-    if (format) {
-      const link = document.createElement('a');
-      link.href = format.fileUrl;
-      link.download = `${book.title}.${selectedFormat}`;
-      link.click();
-      
+    if (format && user) {
       toast({
         title: 'Скачивание начато',
         description: `${book.title} в формате ${selectedFormat.toUpperCase()}`,
       });
+
+      try {
+        // Сервер отдаёт большие файлы частями (206), дочитываем их по Range
+        const params = new URLSearchParams({ action: 'download', bookId: String(book.id), format: format.format });
+        const parts: Blob[] = [];
+        let received = 0;
+        let total = Infinity;
+        let etag: string | null = null;
+
+        while (received < total) {
+          const headers: Record<string, string> = { 'X-User-Email': user.email, Range: `bytes=${received}-` };
+          if (etag) headers['If-Range'] = etag;
+
+          const response = await fetch(`${funcUrls.books}?${params.toString()}`, { headers });
+          if (!response.ok) throw new Error(`Download failed: ${response.status}`);
+
+          const part = await response.blob();
+          const contentRange = response.headers.get('Content-Range');
+          if (response.status === 200 || !contentRange) {
+            parts.splice(0, parts.length, part);
+            break;
+          }
+
+          etag = etag || response.headers.get('ETag');
+          total = Number(contentRange.split('/')[1]);
+          parts.push(part);
+          received += part.size;
+          if (part.size === 0) break;
+        }
+
+        const url = URL.createObjectURL(new Blob(parts));
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = `${book.title}.${selectedFormat}`;
+        link.click();
+        URL.revokeObjectURL(url);
+      } catch (error) {
+        console.error('Failed to download book:', error);
+        toast({
+          title: 'Не удалось скачать книгу',
+          description: 'Попробуйте ещё раз позже',
+          variant: 'destructive',
+        });
+      }
     }
   };
 
@@ -141,9 +182,11 @@ const BookDetail = () => {
           <div className="lg:col-span-1">
             <div className="sticky top-8">
               <div className="relative aspect-[2/3] rounded-lg overflow-hidden shadow-xl">
-                <img
-                  src={book.cover}
+                <CoverImage
+                  cover={book.cover}
+                  coverVariants={book.coverVariants}
                   alt={book.title}
+                  sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                   className="object-cover w-full h-full"
                 />
                 {book.badges && book.badges.length > 0 && (
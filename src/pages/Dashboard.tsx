@@ -54,15 +54,35 @@ const Dashboard = () => {
 
     const fetchStats = async () => {
       try {
-        const [booksRes, musicRes, authRes] = await Promise.all([
-          fetch(`${funcUrls.books}?stats=true`),
-          fetch(`${funcUrls.music}?stats=true`),
-          fetch(`${funcUrls.auth}?stats=true`)
-        ]);
+        const gatewayUrl = (funcUrls as Record<string, string>).api;
+        let booksData, musicData, authData;
 
-        const booksData = await booksRes.json();
-        const musicData = await musicRes.json();
-        const authData = await authRes.json();
+        if (gatewayUrl) {
+          // Объединённый шлюз отдаёт все три сводки за один запрос
+          const response = await fetch(`${gatewayUrl}/batch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+              requests: ['books', 'music', 'auth'].map((name) => ({
+                method: 'GET',
+                path: `/${name}/`,
+                query: { stats: 'true' }
+              }))
+            })
+          });
+          const data = await response.json();
+          [booksData, musicData, authData] = data.responses.map((item: { body: unknown }) => item.body);
+        } else {
+          const [booksRes, musicRes, authRes] = await Promise.all([
+            fetch(`${funcUrls.books}?stats=true`),
+            fetch(`${funcUrls.music}?stats=true`),
+            fetch(`${funcUrls.auth}?stats=true`)
+          ]);
+
+          booksData = await booksRes.json();
+          musicData = await musicRes.json();
+          authData = await authRes.json();
+        }
 
         setStats({
           booksCount: booksData.booksCount || 0,
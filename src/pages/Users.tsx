@@ -1,9 +1,10 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Header } from '@/components/Header';
 import { Button } from '@/components/ui/button';
 import { Card } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
+import { Input } from '@/components/ui/input';
 import { AuthDialog } from '@/components/AuthDialog';
 import { CartDrawer } from '@/components/CartDrawer';
 import { AddBookDialog } from '@/components/AddBookDialog';
@@ -19,35 +20,114 @@ interface User {
   createdAt: string;
 }
 
+const PAGE_SIZE = 50;
+
 const Users = () => {
   const navigate = useNavigate();
   const { isAuthenticated, isAdmin } = useAuth();
   const [users, setUsers] = useState<User[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [exporting, setExporting] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [search, setSearch] = useState('');
+  const [query, setQuery] = useState('');
   const [authDialogOpen, setAuthDialogOpen] = useState(false);
   const [cartOpen, setCartOpen] = useState(false);
   const [addBookOpen, setAddBookOpen] = useState(false);
 
+  const fetchUsers = useCallback(async (cursor: string | null) => {
+    const params = new URLSearchParams({ all: 'true', limit: String(PAGE_SIZE) });
+    if (query) params.set('q', query);
+    if (cursor) params.set('cursor', cursor);
+
+    const response = await fetch(`${funcUrls.auth}?${params.toString()}`);
+    const data = await response.json();
+    return { users: (data.users || []) as User[], nextCursor: (data.nextCursor || null) as string | null };
+  }, [query]);
+
+  useEffect(() => {
+    const timeout = setTimeout(() => setQuery(search.trim()), 300);
+    return () => clearTimeout(timeout);
+  }, [search]);
+
   useEffect(() => {
     if (!isAuthenticated || !isAdmin) {
       navigate('/');
       return;
     }
 
-    const fetchUsers = async () => {
-      try {
-        const response = await fetch(`${funcUrls.auth}?all=true`);
-        const data = await response.json();
-        setUsers(data.users || []);
-      } catch (error) {
-        console.error('Failed to fetch users:', error);
-      } finally {
-        setLoading(false);
-      }
+    let cancelled = false;
+    setLoading(true);
+
+    fetchUsers(null)
+      .then((page) => {
+        if (cancelled) return;
+        setUsers(page.users);
+        setNextCursor(page.nextCursor);
+      })
+      .catch((error) => console.error('Failed to fetch users:', error))
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+
+    return () => {
+      cancelled = true;
     };
+  }, [isAuthenticated, isAdmin, navigate, fetchUsers]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchUsers(nextCursor);
+      setUsers((prev) => [...prev, ...page.users]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Failed to fetch users:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleExport = async () => {
+    setExporting(true);
+    try {
+      const chunks: string[] = [];
+      let cursor: string | null = null;
+      let done = false;
+      while (!done) {
+        const params = new URLSearchParams({ all: 'true', export: 'csv' });
+        if (query) params.set('q', query);
+        if (cursor) params.set('cursor', cursor);
 
-    fetchUsers();
-  }, [isAuthenticated, isAdmin, navigate]);
+        const response = await fetch(`${funcUrls.auth}?${params.toString()}`);
+        if (response.status === 429 || response.status === 503) {
+          // Выгрузка дорогая и ограничена по частоте - ждём, сколько просит сервер, и повторяем часть
+          const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+          await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+          continue;
+        }
+        if (!response.ok) {
+          throw new Error(`Export failed with status ${response.status}`);
+        }
+        chunks.push(await response.text());
+        cursor = response.headers.get('X-Next-Cursor');
+        done = !cursor;
+      }
+
+      const url = URL.createObjectURL(new Blob(chunks, { type: 'text/csv;charset=utf-8' }));
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = 'users.csv';
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (error) {
+      console.error('Failed to export users:', error);
+    } finally {
+      setExporting(false);
+    }
+  };
 
   if (!isAuthenticated || !isAdmin) {
     return null;
@@ -68,7 +148,20 @@ const Users = () => {
             Назад
           </Button>
           <h1 className="text-3xl font-bold">Пользователи</h1>
-          <div className="w-24" />
+          <Button variant="outline" onClick={handleExport} disabled={exporting}>
+            <Icon name="Download" size={18} className="mr-2" />
+            {exporting ? 'Экспорт...' : 'Экспорт CSV'}
+          </Button>
+        </div>
+
+        <div className="relative mb-6">
+          <Icon name="Search" size={18} className="absolute left-3 top-1/2 -translate-y-1/2 text-muted-foreground" />
+          <Input
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="Поиск по email или имени"
+            className="pl-10"
+          />
         </div>
 
         {loading ? (
@@ -111,6 +204,12 @@ const Users = () => {
                 </div>
               </Card>
             ))}
+
+            {nextCursor && (
+              <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+                {loadingMore ? 'Загрузка...' : 'Показать ещё'}
+              </Button>
+            )}
           </div>
         )}
 